@@ -0,0 +1,499 @@
+"""
+    This module implements an autopilot that steers a snake game on every
+    tick, in the GUI (as a tick hook of part_1.Game) or headless (as a
+    tournament bot).
+
+    It plans with A* on the lattice of cells the snake moves on, towards
+    the cells from which the prey gets eaten, and only follows a plan if,
+    once the prey is eaten, the head can still reach the tail. Otherwise
+    it follows its tail, or failing that moves towards the most room.
+
+    The body is not rebuilt every tick: each cell keeps the tick at which
+    the head last entered it, which tells both whether a segment sits on
+    it and how many moves it takes for the tail to clear it, and moving
+    the head updates a single cell. Searches use that to treat segments
+    the tail will have left by the time the head gets there as free.
+    A plan is kept, and costs nothing to follow, for as long as the head
+    follows it and the prey stays put; a new one is computed only when
+    the prey moves or the plan breaks. Every decision has a time budget:
+    searches that run out of it give way to cheaper fallbacks, down to
+    a constant-time choice of a safe neighbouring cell. The search for a
+    plan runs backwards from the prey, so it doesn't depend on where the
+    head is, and one that runs out of time is resumed on the next tick
+    instead of started over: on a large board it takes a few ticks to
+    reach the head, rather than never finishing.
+"""
+
+import heapq
+import time
+from array import array
+from collections import deque
+
+from engine import BoardConfig, OPPOSITE_DIRECTIONS, SnakeEngine
+from instrumentation import Histogram
+
+#tick the cells no segment has entered yet were "entered", far enough in the past
+NEVER = -(1 << 62)
+#pops between two looks at the clock while searching
+CLOCK_CHECK_INTERVAL = 16
+#ticks to wait before planning for a prey again after no safe plan was found in time
+RETRY_INTERVAL = 4
+
+
+class Autopilot():
+    """
+        This class chooses the direction of every move of one game at a
+        time. Call decide(game) before each tick, or add it to the tick
+        hooks of a part_1.Game.
+    """
+    def __init__(self, config: BoardConfig | None = None, budget: float = 0.002,
+                 latency: Histogram | None = None) -> None:
+        """
+            The initializer sets up the lattice of config's board. budget
+            is the time (sec) a decision may take; decision latencies are
+            recorded in latency, in nanoseconds.
+        """
+        self.latency = latency if latency is not None else Histogram()
+        self.budget = budget
+        self.counts = {"decisions": 0, "plans": 0, "planSteps": 0, "unsafePlans": 0,
+                       "tailFollows": 0, "roomMoves": 0, "lastResorts": 0, "timeouts": 0}
+        self.setBoard(config if config is not None else BoardConfig())
+
+    def setBoard(self, config: BoardConfig) -> None:
+        """
+            This method sizes the lattice for config's board and forgets
+            the game being steered.
+        """
+        self.config = config
+        self.step = config.preyIconWidth
+        self.xOrigin, self.yOrigin = config.xOrigin, config.yOrigin
+        self.columns, self.rows = config.columns, config.rows
+        #index of the lattice cell at a coordinate, -1 if it is not a cell inside the board
+        self.cell = config.cell
+        #tick at which the head last entered each cell, row by row
+        self.enteredAt = array("q", [NEVER]) * (self.columns * self.rows)
+        #number of the last search that reached each cell, and the cell it came from
+        self.marks = array("q", [0]) * len(self.enteredAt)
+        self.parents = array("i", [-1]) * len(self.enteredAt)
+        self.searches = 0
+        #number of the last prey search that reached each cell, the cell after it and the moves left from it
+        self.fieldMarks = array("q", [0]) * len(self.enteredAt)
+        self.fieldNext = array("i", [-1]) * len(self.enteredAt)
+        self.fieldMoves = array("i", [0]) * len(self.enteredAt)
+        self.fields = 0
+        self.fieldPrey: tuple | None = None
+        self.fieldFrontier: list[tuple[int, int, int]] = []
+        self.game: SnakeEngine | None = None
+        self.headTime = 0       # tick the head entered its current cell
+        self.lastHead = (0, 0)
+        self.length = 0
+        self.lastTicks = -1
+        self.plan: deque[int] = deque()     # cells still to enter, in order
+        self.planPrey: tuple | None = None
+        self.targets: tuple[set[int], set[int], tuple[int, int, int, int]] | None = None
+        self.targetsPrey: tuple | None = None
+        self.failedPrey: tuple | None = None
+        self.retryAt = 0
+
+    def direction(self, source: int, target: int) -> str:
+        """
+            This method returns the direction from a cell to
+            a neighbouring one.
+        """
+        sourceRow, sourceColumn = divmod(source, self.columns)
+        targetRow, targetColumn = divmod(target, self.columns)
+        if targetColumn != sourceColumn:
+            return "Right" if targetColumn > sourceColumn else "Left"
+        return "Down" if targetRow > sourceRow else "Up"
+
+    def neighbours(self, cell: int) -> list[int]:
+        """
+            This method returns the cells next to cell inside the board.
+        """
+        columns = self.columns
+        column = cell % columns
+        result = []
+        if column > 0:
+            result.append(cell - 1)
+        if column < columns - 1:
+            result.append(cell + 1)
+        if cell >= columns:
+            result.append(cell - columns)
+        if cell + columns < len(self.enteredAt):
+            result.append(cell + columns)
+        return result
+
+    def sync(self, game: SnakeEngine) -> int:
+        """
+            This method brings the cell times up to date with game and
+            returns the cell of its head, or -1 if it left the board.
+            Following a game tick by tick costs O(1) per tick; any other
+            change (a new game, a replay seek) rebuilds from the body.
+        """
+        if game.config is not self.config:
+            self.setBoard(game.config)
+        body = game.snakeCoordinates
+        head = self.cell(body[-1])
+        length = len(body)
+        lastHead = self.cell(self.lastHead)
+        if (game is self.game and game.ticks == self.lastTicks + 1 and head >= 0 and lastHead >= 0
+                and head in self.neighbours(lastHead)):
+            self.headTime += 1
+            self.enteredAt[head] = self.headTime
+            if length > self.length:    # the snake ate and grew a tail
+                tail = self.cell(body[0])
+                if tail >= 0:
+                    self.enteredAt[tail] = max(self.enteredAt[tail], self.headTime - length + 1)
+        else:
+            # jump ahead in time so every older entry reads as vacated
+            self.headTime += self.length + length + 1
+            for i, coordinate in enumerate(body):
+                segment = self.cell(coordinate)
+                if segment >= 0:
+                    self.enteredAt[segment] = self.headTime - (length - 1 - i)
+            self.game = game
+            self.plan.clear()
+            self.fieldPrey = None
+        self.lastHead = body[-1]
+        self.lastTicks = game.ticks
+        self.length = length
+        return head
+
+    def preyTargets(self, prey: tuple) -> tuple[set[int], set[int], tuple[int, int, int, int]]:
+        """
+            This method returns the cells entering which horizontally,
+            then vertically, eats the prey, as SnakeEngine.move decides,
+            and the bounding box (columns, rows) of all of them.
+        """
+        if prey == self.targetsPrey:
+            return self.targets
+        config = self.config
+        tolerance = abs(config.snakeIconWidth - config.preyIconWidth)
+        width = config.preyIconWidth
+        horizontal, vertical = set(), set()
+        left, top = prey[0], prey[1]
+        # only lattice points can be cells, so step through those near the prey
+        xStart = int(left) - tolerance - self.step
+        yStart = int(top) - tolerance - self.step
+        xStart += (self.xOrigin - xStart) % self.step
+        yStart += (self.yOrigin - yStart) % self.step
+        for x in range(xStart, int(left) + width + tolerance + self.step + 1, self.step):
+            for y in range(yStart, int(top) + width + tolerance + self.step + 1, self.step):
+                cell = self.cell((x, y))
+                if cell < 0:
+                    continue
+                xDistance, yDistance = x - left, y - top
+                if 0 <= xDistance <= width and -tolerance <= yDistance <= width + tolerance:
+                    horizontal.add(cell)
+                if 0 <= yDistance <= width and -tolerance <= xDistance <= width + tolerance:
+                    vertical.add(cell)
+        cells = horizontal | vertical
+        columns = [cell % self.columns for cell in cells] or [0]
+        rows = [cell // self.columns for cell in cells] or [0]
+        self.targets = (horizontal, vertical, (min(columns), max(columns), min(rows), max(rows)))
+        self.targetsPrey = prey
+        return self.targets
+
+    def search(self, start: int, goal, box: tuple[int, int, int, int], deadline: float,
+               enteredAt=None, headTime: int | None = None, length: int | None = None,
+               limit: int = 0, eats=None) -> list[int] | int | None:
+        """
+            This method runs A* from start and returns the cells of a path
+            to a cell for which goal(previous, cell) is true, or None.
+            A cell is passable if the tail has left it by the time the
+            head gets there; for a move for which eats(previous, cell) is
+            true, a tick earlier, as the tail grows back where it was.
+            The heuristic is the distance to box (columns, rows). If limit
+            is set, the search stops after reaching limit cells and returns
+            the number of cells reached instead.
+            It returns None as well when deadline (perf_counter) passes.
+        """
+        enteredAt = self.enteredAt if enteredAt is None else enteredAt
+        headTime = self.headTime if headTime is None else headTime
+        length = self.length if length is None else length
+        columns, cellCount = self.columns, len(self.enteredAt)
+        minColumn, maxColumn, minRow, maxRow = box
+        # cells marked with this search's number have been reached, so nothing is cleared between searches
+        self.searches += 1
+        searchNumber, marks, parents = self.searches, self.marks, self.parents
+        marks[start] = searchNumber
+        reached = 1
+        frontier = [(0, 0, start)]
+        pops = CLOCK_CHECK_INTERVAL - 1   # look at the clock before the first pop too
+        while frontier:
+            _, negativeSteps, cell = heapq.heappop(frontier)
+            pops += 1
+            if pops % CLOCK_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                self.counts["timeouts"] += 1
+                return None
+            arrival = -negativeSteps + 1
+            column = cell % columns
+            for neighbour in (cell - 1 if column > 0 else -1, cell + 1 if column < columns - 1 else -1,
+                              cell - columns, cell + columns if cell + columns < cellCount else -1):
+                if neighbour < 0 or marks[neighbour] == searchNumber:
+                    continue
+                spare = headTime - enteredAt[neighbour] + arrival - length
+                if spare < 0 or (spare == 0 and eats is not None and eats(cell, neighbour)):
+                    continue    # a segment will still be there
+                marks[neighbour] = searchNumber
+                parents[neighbour] = cell
+                reached += 1
+                if limit and reached >= limit:
+                    return reached
+                if goal(cell, neighbour):
+                    path = [neighbour]
+                    while parents[path[-1]] != start:
+                        path.append(parents[path[-1]])
+                    path.reverse()
+                    return path
+                neighbourRow, neighbourColumn = divmod(neighbour, columns)
+                estimate = (max(0, minColumn - neighbourColumn, neighbourColumn - maxColumn)
+                            + max(0, minRow - neighbourRow, neighbourRow - maxRow))
+                heapq.heappush(frontier, (arrival + estimate, -arrival, neighbour))
+        return reached if limit else None
+
+    def tailReachable(self, path: list[int], deadline: float) -> bool:
+        """
+            This method checks that after following path, and growing by
+            eating at its end, the head can still reach the tail.
+        """
+        length = self.length + 1
+        headTime = self.headTime + len(path)
+        enteredAt = PathOverlay(self.enteredAt, path, self.headTime)
+        # the new tail is the cell the head entered length - 1 moves before the end of the path
+        body = self.game.snakeCoordinates
+        tailTime = headTime - length + 1
+        if tailTime > self.headTime:
+            tail = path[tailTime - self.headTime - 1]
+        else:
+            tail = self.cell(body[max(0, len(body) - 1 - (self.headTime - tailTime))])
+        if tail < 0:
+            return False
+        columns = self.columns
+        box = (tail % columns, tail % columns, tail // columns, tail // columns)
+        return self.search(path[-1], lambda previous, cell: cell == tail, box, deadline,
+                           enteredAt, headTime, length) is not None
+
+    def eater(self, prey: tuple):
+        """
+            This method returns a function telling whether the move from
+            one cell to a neighbouring one eats the prey.
+        """
+        horizontal, vertical, _ = self.preyTargets(prey)
+        columns = self.columns
+        def eats(previous: int, cell: int) -> bool:
+            if previous // columns == cell // columns:  # a horizontal move
+                return cell in horizontal
+            return cell in vertical
+        return eats
+
+    def planForPrey(self, head: int, prey: tuple, deadline: float) -> list[int] | None:
+        """
+            This method returns a path whose last move eats the prey,
+            or None if there is none or it was not found in time.
+            It runs A* backwards from the cells that eat the prey towards
+            the head, recording for every cell reached the next cell and
+            the moves left to the prey, and resumes where it stopped on
+            the next call for the same prey. A cell is let in if it is
+            free by the earliest tick the head could get there; that only
+            gets later as the head moves, so the cells let in stay
+            passable, but for those the head enters meanwhile, and paths
+            are checked again before they are returned.
+        """
+        eats = self.eater(prey)
+        horizontal, vertical, _ = self.preyTargets(prey)
+        targets = horizontal | vertical
+        columns, cellCount = self.columns, len(self.enteredAt)
+        enteredAt, headTime, length = self.enteredAt, self.headTime, self.length
+        marks, following, movesLeft = self.fieldMarks, self.fieldNext, self.fieldMoves
+        headRow, headColumn = divmod(head, columns)
+        if prey != self.fieldPrey or not self.fieldFrontier:
+            # a new prey, or the last search found no path: start over
+            self.counts["plans"] += 1
+            self.fields += 1
+            self.fieldPrey = prey
+            self.fieldFrontier = []
+            for target in targets:
+                row, column = divmod(target, columns)
+                earliest = abs(row - headRow) + abs(column - headColumn)
+                if earliest == 0 or headTime - enteredAt[target] + earliest < length + 1:
+                    continue    # the tail grows back when the snake eats, so the cell must be free a tick earlier
+                marks[target] = self.fields
+                following[target] = -1
+                movesLeft[target] = 1
+                heapq.heappush(self.fieldFrontier, (1 + earliest, -1, target))
+        fieldNumber, frontier = self.fields, self.fieldFrontier
+        # the head may have moved next to cells reached on an earlier tick
+        reached = [neighbour for neighbour in self.neighbours(head) if marks[neighbour] == fieldNumber]
+        for neighbour in sorted(reached, key=movesLeft.__getitem__):
+            path = self.fieldPath(head, neighbour, eats)
+            if path is not None:
+                return path
+        pops = 0
+        while frontier:
+            if pops % CLOCK_CHECK_INTERVAL == 0 and time.perf_counter() > deadline:
+                self.counts["timeouts"] += 1
+                return None
+            pops += 1
+            _, negativeMoves, cell = heapq.heappop(frontier)
+            row, column = divmod(cell, columns)
+            if abs(row - headRow) + abs(column - headColumn) == 1:
+                path = self.fieldPath(head, cell, eats)
+                if path is not None:
+                    return path
+            moves = -negativeMoves + 1
+            for neighbour in (cell - 1 if column > 0 else -1, cell + 1 if column < columns - 1 else -1,
+                              cell - columns, cell + columns if cell + columns < cellCount else -1):
+                if neighbour < 0 or marks[neighbour] == fieldNumber or neighbour in targets:
+                    continue
+                if moves == 2 and not eats(neighbour, cell):
+                    continue    # entering the target from here doesn't eat the prey
+                neighbourRow, neighbourColumn = divmod(neighbour, columns)
+                earliest = abs(neighbourRow - headRow) + abs(neighbourColumn - headColumn)
+                if earliest == 0 or headTime - enteredAt[neighbour] + earliest < length:
+                    continue    # a segment will still be there
+                marks[neighbour] = fieldNumber
+                following[neighbour] = cell
+                movesLeft[neighbour] = moves
+                heapq.heappush(frontier, (moves + earliest, -moves, neighbour))
+        return None
+
+    def fieldPath(self, head: int, first: int, eats) -> list[int] | None:
+        """
+            This method returns the path the prey search recorded from
+            first, a cell next to the head, if the head can follow it now:
+            every cell is free when the head gets there and only the last
+            move eats. Otherwise it returns None.
+        """
+        path = [first]
+        while self.fieldNext[path[-1]] >= 0:
+            path.append(self.fieldNext[path[-1]])
+        previous, last = head, len(path)
+        for arrival, cell in enumerate(path, 1):
+            eaten = eats(previous, cell)
+            if eaten != (arrival == last) or self.headTime - self.enteredAt[cell] + arrival < self.length + eaten:
+                return None
+            previous = cell
+        return path
+
+    def passable(self, head: int, cell: int, eats) -> bool:
+        """
+            This method tells whether the head can move to cell,
+            a neighbouring one, on the next tick.
+        """
+        return self.headTime - self.enteredAt[cell] + 1 >= self.length + (1 if eats(head, cell) else 0)
+
+    def mostRoom(self, head: int, deadline: float, eats) -> int:
+        """
+            This method returns the neighbouring cell from which the
+            head can reach the most cells, counting up to the snake's
+            length, or -1 if every neighbour is blocked now.
+        """
+        best, bestRoom = -1, -1
+        for neighbour in self.neighbours(head):
+            if not self.passable(head, neighbour, eats):
+                continue
+            room = self.search(neighbour, lambda previous, cell: False, (0, self.columns, 0, self.rows),
+                               deadline, self.enteredAt, self.headTime + 1, self.length, self.length + 1, eats)
+            size = room if room is not None else 0
+            if size > bestRoom:
+                best, bestRoom = neighbour, size
+        return best
+
+    def decide(self, game: SnakeEngine) -> str:
+        """
+            This method returns the direction for the next move of game,
+            never the reverse of the current one. It takes about budget
+            seconds at most.
+        """
+        start = time.perf_counter()
+        counts = self.counts
+        counts["decisions"] += 1
+        try:
+            head = self.sync(game)
+            if head < 0:
+                return game.direction
+            prey = game.preyCoordinates
+            eats = self.eater(prey)
+            plan = self.plan
+            if plan and self.planPrey == prey and plan[0] in self.neighbours(head) \
+                    and self.passable(head, plan[0], eats):
+                counts["planSteps"] += 1
+                return self.turn(game, head, plan.popleft())
+            plan.clear()
+            budget = self.budget
+            if prey != self.failedPrey or game.ticks >= self.retryAt:
+                path = self.planForPrey(head, prey, start + budget * 0.5)
+                if path is not None and self.tailReachable(path, start + budget * 0.75):
+                    plan.extend(path[1:])
+                    self.planPrey = prey
+                    self.failedPrey = None
+                    counts["planSteps"] += 1
+                    return self.turn(game, head, path[0])
+                if path is not None:
+                    counts["unsafePlans"] += 1
+                if path is not None or not self.fieldFrontier:
+                    # follow the tail for a few ticks, which opens up the board, then try again
+                    self.failedPrey, self.retryAt = prey, game.ticks + RETRY_INTERVAL
+            tail = self.cell(game.snakeCoordinates[0])
+            if tail >= 0:
+                columns = self.columns
+                box = (tail % columns, tail % columns, tail // columns, tail // columns)
+                path = self.search(head, lambda previous, cell: cell == tail, box, start + budget * 0.85,
+                                   eats=eats)
+                if path is not None:
+                    counts["tailFollows"] += 1
+                    return self.turn(game, head, path[0])
+            neighbour = self.mostRoom(head, start + budget * 0.95, eats)
+            if neighbour >= 0:
+                counts["roomMoves"] += 1
+                return self.turn(game, head, neighbour)
+            counts["lastResorts"] += 1
+            return game.direction
+        finally:
+            self.latency.add(int((time.perf_counter() - start) * 1e9))
+
+    def turn(self, game: SnakeEngine, head: int, target: int) -> str:
+        """
+            This method returns the direction from the head to target,
+            keeping the current direction if that would be a reversal.
+        """
+        direction = self.direction(head, target)
+        return game.direction if direction == OPPOSITE_DIRECTIONS[game.direction] else direction
+
+    def beforeTick(self, game: SnakeEngine) -> None:
+        """
+            This method steers game before its next tick, so the
+            autopilot can be one of part_1.Game's tick hooks.
+        """
+        if game.gameNotOver:
+            game.direction = self.decide(game)
+
+    def afterTick(self, game: SnakeEngine) -> None:
+        """
+            This method does nothing; it lets the autopilot be used
+            as a tick hook.
+        """
+
+    def report(self) -> dict:
+        """
+            This method returns the decision counts and the decision
+            latency (ns) summary.
+        """
+        return {**self.counts, "latency": self.latency.summary()}
+
+
+class PathOverlay():
+    """
+        This class reads like the cell times of an Autopilot after the
+        head has followed a path, without copying them.
+    """
+    __slots__ = ("enteredAt", "times")
+
+    def __init__(self, enteredAt: array, path: list[int], headTime: int) -> None:
+        self.enteredAt = enteredAt
+        self.times = {cell: headTime + i + 1 for i, cell in enumerate(path)}
+
+    def __getitem__(self, cell: int) -> int:
+        entered = self.times.get(cell)
+        return self.enteredAt[cell] if entered is None else entered
@@ -0,0 +1,266 @@
+"""
+    This module implements a batched version of the snake game rules
+    in engine.SnakeEngine. It holds N independent games in NumPy
+    arrays and advances all of them with one call, so bots can be
+    evaluated over millions of game ticks per second on a single core.
+    The movement, prey-hit tolerance, growth and game over rules are
+    the same as SnakeEngine's; only the random number stream differs.
+"""
+
+import numpy as np
+
+from engine import BoardConfig, DIRECTIONS, START_X, START_Y
+
+#direction codes index engine.DIRECTIONS: 0 Left, 1 Right, 2 Up, 3 Down
+KEEP_DIRECTION = -1     #direction code meaning "don't turn this tick"
+OPPOSITE_CODES = np.array([1, 0, 3, 2], dtype=np.int8)
+X_STEPS = np.array([-1, 1, 0, 0], dtype=np.int32)
+Y_STEPS = np.array([0, 0, -1, 1], dtype=np.int32)
+
+#cause of death codes stored in BatchEngine.causeOfDeath
+ALIVE, WALL, SELF, BOARD_FULL = 0, 1, 2, 3
+CAUSES_OF_DEATH = (None, "wall", "self", "board_full")
+
+#same score text box as SnakeEngine.isFreePreyCell: (60 + scoreWidth, 15 + scoreHeight)
+SCORE_TEXT_CORNER = (60 + 55, 15 + 15)
+
+
+class BatchEngine():
+    '''
+        This class steps N independent snake games together.
+        Every snake moves on a lattice PREY_ICON_WIDTH pixels apart, so
+        its body is kept as a ring buffer of (x, y) pixels per game and
+        its occupancy as a per-game grid of lattice cells.
+    '''
+    def __init__(self, numberOfGames: int, config: BoardConfig | None = None,
+                 seed: int | None = None) -> None:
+        """
+            The initializer creates numberOfGames games in their starting
+            state (the same 5 segment snake moving left) and places the
+            first prey of each game using a generator seeded with seed.
+        """
+        self.config = config if config is not None else BoardConfig()
+        self.random = np.random.default_rng(seed)
+        self.numberOfGames = numberOfGames
+        step = self.config.preyIconWidth
+        #every segment lies on the board's lattice, see BoardConfig
+        self.xOrigin, self.yOrigin = self.config.xOrigin, self.config.yOrigin
+        self.gridWidth, self.gridHeight = self.config.columns, self.config.rows
+        #a snake can never be longer than the board has cells, plus the tail grown past a wall
+        self.capacity = self.gridWidth * self.gridHeight + 2
+
+        games = np.arange(numberOfGames)
+        self.direction = np.zeros(numberOfGames, dtype=np.int8)     # all start moving "Left"
+        self.alive = np.ones(numberOfGames, dtype=bool)
+        self.causeOfDeath = np.zeros(numberOfGames, dtype=np.int8)
+        self.score = np.zeros(numberOfGames, dtype=np.int32)
+        self.ticks = np.zeros(numberOfGames, dtype=np.int32)
+        #body ring buffers: the tail is at tailIndex, the head length - 1 slots after it
+        self.bodyX = np.zeros((numberOfGames, self.capacity), dtype=np.int32)
+        self.bodyY = np.zeros((numberOfGames, self.capacity), dtype=np.int32)
+        self.tailIndex = np.zeros(numberOfGames, dtype=np.int64)
+        self.length = np.full(numberOfGames, 5, dtype=np.int64)
+        #number of segments on each lattice cell of each game
+        self.occupancy = np.zeros((numberOfGames, self.gridWidth, self.gridHeight), dtype=np.int16)
+        for i in range(5):  # tail first, head last, as in snakeCoordinates
+            x = np.full(numberOfGames, START_X - i * step, dtype=np.int32)
+            y = np.full(numberOfGames, START_Y, dtype=np.int32)
+            self.bodyX[:, i] = x
+            self.bodyY[:, i] = y
+            self.occupy(games, x, y, 1)
+        self.headX = self.bodyX[:, 4].copy()
+        self.headY = self.bodyY[:, 4].copy()
+        #top left corner of each prey icon
+        self.preyX = np.zeros(numberOfGames, dtype=np.float64)
+        self.preyY = np.zeros(numberOfGames, dtype=np.float64)
+        self.createNewPrey(games)
+
+    def occupy(self, games: np.ndarray, x: np.ndarray, y: np.ndarray, change: int) -> None:
+        """
+            This method adds change to the occupancy count of the (x, y)
+            pixel of each game in games. Tails grown past a wall are not
+            on the grid; they can neither be bitten nor block prey.
+        """
+        column, row, inside = self.toCells(x, y)
+        self.occupancy[games[inside], column[inside], row[inside]] += change
+
+    def toCells(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            This method converts lattice pixels to grid cells and
+            returns the columns, rows and a mask of those on the board.
+        """
+        step = self.config.preyIconWidth
+        column = (x - self.xOrigin) // step
+        row = (y - self.yOrigin) // step
+        inside = (x > 0) & (y > 0) & (column < self.gridWidth) & (row < self.gridHeight)
+        return column, row, inside
+
+    def step(self, directions: np.ndarray | None = None) -> np.ndarray:
+        """
+            This method advances every running game by one tick, first
+            turning each snake to its direction code in directions
+            (KEEP_DIRECTION to keep going; reversals are ignored).
+            Games that are over are masked out and left untouched.
+            It returns the mask of games still running.
+        """
+        games = np.flatnonzero(self.alive)
+        if games.size == 0:
+            return self.alive
+        config = self.config
+        PREY_ICON_WIDTH = config.preyIconWidth
+        tolerance = abs(config.snakeIconWidth - PREY_ICON_WIDTH)
+        capacity = self.capacity
+
+        # turn the snakes, ignoring keys that would reverse them
+        direction = self.direction[games]
+        if directions is not None:
+            wanted = np.asarray(directions, dtype=np.int8)[games]
+            turn = (wanted != KEEP_DIRECTION) & (wanted != OPPOSITE_CODES[direction])
+            direction = np.where(turn, wanted, direction)
+            self.direction[games] = direction
+
+        # calculate the new head and add it to the body
+        newX = self.headX[games] + X_STEPS[direction] * PREY_ICON_WIDTH
+        newY = self.headY[games] + Y_STEPS[direction] * PREY_ICON_WIDTH
+        tail = self.tailIndex[games]
+        headIndex = (tail + self.length[games]) % capacity
+        self.bodyX[games, headIndex] = newX
+        self.bodyY[games, headIndex] = newY
+        self.headX[games] = newX
+        self.headY[games] = newY
+        self.occupy(games, newX, newY, 1)
+
+        # remove the tail
+        self.occupy(games, self.bodyX[games, tail], self.bodyY[games, tail], -1)
+        tail = (tail + 1) % capacity
+        self.tailIndex[games] = tail
+
+        # check if the snake head has touched the prey icon, allowing extra tolerance across the movement axis
+        xDistPreySnake = newX - self.preyX[games]
+        yDistPreySnake = newY - self.preyY[games]
+        vertical = direction >= 2
+        alongDist = np.where(vertical, yDistPreySnake, xDistPreySnake)
+        acrossDist = np.where(vertical, xDistPreySnake, yDistPreySnake)
+        preyEaten = ((alongDist <= PREY_ICON_WIDTH) & (alongDist >= 0) &
+                     (acrossDist <= PREY_ICON_WIDTH + tolerance) & (acrossDist >= -tolerance))
+
+        # grow the snakes that ate at their open tail end
+        eaters = games[preyEaten]
+        if eaters.size:
+            self.score[eaters] += 1
+            eaterTail = tail[preyEaten]
+            tailX = self.bodyX[eaters, eaterTail]
+            tailY = self.bodyY[eaters, eaterTail]
+            nextIndex = (eaterTail + 1) % capacity
+            xStep = np.sign(tailX - self.bodyX[eaters, nextIndex])
+            yStep = np.sign(tailY - self.bodyY[eaters, nextIndex])
+            sameColumn = xStep == 0
+            # a vertical tail end points down or up; otherwise it points right or left
+            addX = tailX + np.where(sameColumn, 0, np.where(xStep > 0, 1, -1)) * PREY_ICON_WIDTH
+            addY = tailY + np.where(sameColumn, np.where(yStep > 0, 1, -1), 0) * PREY_ICON_WIDTH
+            eaterTail = (eaterTail - 1) % capacity
+            self.bodyX[eaters, eaterTail] = addX
+            self.bodyY[eaters, eaterTail] = addY
+            self.tailIndex[eaters] = eaterTail
+            self.length[eaters] += 1
+            self.occupy(eaters, addX, addY, 1)
+            self.createNewPrey(eaters)
+
+        # check if the game is over: the head passed a wall or bit the snake
+        hitWall = ((newX >= config.windowWidth) | (newX <= 0) |
+                   (newY >= config.windowHeight) | (newY <= 0))
+        column, row, inside = self.toCells(newX, newY)
+        bitItself = np.zeros(games.size, dtype=bool)
+        bitItself[inside] = self.occupancy[games[inside], column[inside], row[inside]] > 1
+        stillAlive = self.alive[games]  # false where the board filled up while placing prey
+        self.causeOfDeath[games[stillAlive & bitItself]] = SELF
+        self.causeOfDeath[games[stillAlive & hitWall]] = WALL
+        self.alive[games] = stillAlive & ~hitWall & ~bitItself
+        self.ticks[games] += 1
+        return self.alive
+
+    def isFreePreyCell(self, games: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+            This method returns a mask of the candidate prey pixels (x, y)
+            that are neither on the score text nor within the snake icon
+            width of a segment of the corresponding game.
+        """
+        free = ~((x < SCORE_TEXT_CORNER[0]) | ((x == SCORE_TEXT_CORNER[0]) & (y < SCORE_TEXT_CORNER[1])))
+        step = self.config.preyIconWidth
+        buffer = (self.config.snakeIconWidth - step) // 2
+        for i in range(-buffer, buffer + 1):
+            # a segment on the same column i pixels away, or on the same row
+            for segmentX, segmentY in ((x, y + i), (x + i, y)):
+                onLattice = ((segmentX - self.xOrigin) % step == 0) & ((segmentY - self.yOrigin) % step == 0)
+                column, row, inside = self.toCells(segmentX, segmentY)
+                check = onLattice & inside
+                free[check] &= self.occupancy[games[check], column[check], row[check]] == 0
+        return free
+
+    def createNewPrey(self, games: np.ndarray) -> None:
+        """
+            This method places a new prey in each game in games, drawing
+            candidates uniformly at random and keeping the first free one.
+            Games still without prey after MAX_SAMPLE_ATTEMPTS draws fall
+            back to a full board scan; games with no free pixel left end.
+        """
+        THRESHOLD = self.config.threshold
+        MAX_SAMPLE_ATTEMPTS = 64
+        halfWidth = self.config.preyIconWidth / 2
+        pending = games
+        for _ in range(MAX_SAMPLE_ATTEMPTS):
+            if pending.size == 0:
+                return
+            x = self.random.integers(THRESHOLD, self.config.windowWidth - THRESHOLD, pending.size, dtype=np.int32)
+            y = self.random.integers(THRESHOLD, self.config.windowHeight - THRESHOLD, pending.size, dtype=np.int32)
+            free = self.isFreePreyCell(pending, x, y)
+            self.preyX[pending[free]] = x[free] - halfWidth
+            self.preyY[pending[free]] = y[free] - halfWidth
+            pending = pending[~free]
+        for game in pending:
+            self.scanForPrey(int(game))
+
+    def scanForPrey(self, game: int) -> None:
+        """
+            This method places the prey of a nearly full game by listing
+            every free pixel of its board and picking one at random.
+        """
+        THRESHOLD = self.config.threshold
+        xs, ys = np.meshgrid(np.arange(THRESHOLD, self.config.windowWidth - THRESHOLD, dtype=np.int32),
+                             np.arange(THRESHOLD, self.config.windowHeight - THRESHOLD, dtype=np.int32),
+                             indexing="ij")
+        xs, ys = xs.ravel(), ys.ravel()
+        free = self.isFreePreyCell(np.full(xs.size, game), xs, ys)
+        if not free.any():
+            # nowhere left to put prey, the game cannot continue
+            self.alive[game] = False
+            self.causeOfDeath[game] = BOARD_FULL
+            return
+        choice = self.random.choice(np.flatnonzero(free))
+        halfWidth = self.config.preyIconWidth / 2
+        self.preyX[game] = xs[choice] - halfWidth
+        self.preyY[game] = ys[choice] - halfWidth
+
+    def snakeCoordinates(self, game: int) -> list[tuple[int, int]]:
+        """
+            This method returns the body of one game as a list of
+            (x, y) tuples, tail first and head last, like SnakeEngine.
+        """
+        indices = (self.tailIndex[game] + np.arange(self.length[game])) % self.capacity
+        return list(zip(self.bodyX[game, indices].tolist(), self.bodyY[game, indices].tolist()))
+
+    def preyCoordinates(self, game: int) -> tuple[float, float, float, float]:
+        """
+            This method returns the prey rectangle of one game in the
+            same (x0, y0, x1, y1) form as SnakeEngine.preyCoordinates.
+        """
+        width = self.config.preyIconWidth
+        x, y = float(self.preyX[game]), float(self.preyY[game])
+        return (x, y, x + width, y + width)
+
+    def directionName(self, game: int) -> str:
+        """
+            This method returns the direction of one game as its
+            arrow key name.
+        """
+        return DIRECTIONS[self.direction[game]]
@@ -0,0 +1,351 @@
+"""
+    This program benchmarks the game's hot paths with fixed seeds:
+
+        python benchmark.py --output results.json
+        python benchmark.py --compare results.json
+
+    It times SnakeEngine.createNewPrey, move, isGameOver and
+    calculateNewCoordinates (the rules part_1.Game runs) over a grid of
+    snake lengths and board sizes, the drain throughput of
+    part_1.QueueHandler, the part_2 producer/consumer pipeline for
+    several thread counts and the decisions of autopilot.Autopilot. Results are saved as JSON; the compare mode
+    flags results slower than a stored baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import queue
+import random
+import sys
+import threading
+import time
+import types
+from collections import Counter, deque
+from collections.abc import Callable
+from unittest import mock
+
+import part_2
+from autopilot import Autopilot
+from engine import BoardConfig, SnakeEngine
+
+SNAKE_LENGTHS = (5, 50, 500, 5_000, 50_000)
+BOARD_SIZES = ((500, 300), (1_000, 1_000), (10_000, 10_000))
+THREAD_COUNTS = (1, 2, 4, 8)
+SEED = 12345
+#prey placed where the snake can never reach it, so timed moves never eat
+UNREACHABLE_PREY = (-1000.0, -1000.0, -990.0, -990.0)
+
+
+def measure(operation: Callable[[int], None], minTime: float, repeats: int,
+            minIterations: int = 1) -> float:
+    """
+        This function returns the best operations per second of
+        repeats runs of operation(iterations), after calibrating
+        iterations so that a run takes about minTime seconds.
+        Runs do at least minIterations operations, so fixed start-up
+        costs (such as starting processes) don't dominate.
+    """
+    iterations = minIterations
+    while True:
+        start = time.perf_counter()
+        operation(iterations)
+        elapsed = time.perf_counter() - start
+        if elapsed >= minTime / 4 or iterations >= 1 << 24:
+            break
+        iterations *= 4
+    iterations = max(minIterations, int(iterations * minTime / max(elapsed, 1e-9)))
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        operation(iterations)
+        best = max(best, iterations / (time.perf_counter() - start))
+    return best
+
+
+def cycleGame(length: int, width: int, height: int) -> tuple[SnakeEngine, list[str]] | None:
+    """
+        This function returns a game on a width x height board whose
+        snake of the given length lies on a closed serpentine cycle, with
+        the direction to take at every cycle position, so the snake can
+        move forever without dying. It returns None if it doesn't fit.
+    """
+    config = BoardConfig(width, height)
+    columns, rows = config.columns, config.rows
+    cycleRows = -(-(length + 2) // columns)
+    cycleRows += cycleRows % 2  # the serpentine needs an even number of rows to close
+    if columns < 2 or cycleRows > rows:
+        return None
+    # right along row 0, then serpentine over columns 1.. and back up column 0
+    cells = []
+    for row in range(cycleRows):
+        cells.extend((column, row) for column in (range(columns) if row == 0 else
+                     range(1, columns) if row % 2 == 0 else range(columns - 1, 0, -1)))
+    cells.extend((0, row) for row in range(cycleRows - 1, 0, -1))
+    cycle = [config.coordinate(column, row) for column, row in cells]
+    directions = []
+    for (x0, y0), (x1, y1) in zip(cycle, cycle[1:] + cycle[:1]):
+        directions.append("Right" if x1 > x0 else "Left" if x1 < x0 else "Down" if y1 > y0 else "Up")
+
+    game = SnakeEngine(config, random.Random(SEED))
+    game.snakeCoordinates = deque(cycle[:length])
+    game.occupiedCells = Counter(game.snakeCoordinates)
+    game.direction = directions[length - 1]
+    game.preyCoordinates = UNREACHABLE_PREY
+    # rotate so that directions[i] is the move made on the i-th timed tick
+    return game, directions[length - 1:] + directions[:length - 1]
+
+
+def benchmarkRules(lengths: tuple[int, ...], boards: tuple[tuple[int, int], ...],
+                   minTime: float, repeats: int) -> list[dict]:
+    """
+        This function times the four game rule methods for every snake
+        length and board size that fit together.
+    """
+    results = []
+    for width, height in boards:
+        for length in lengths:
+            setup = cycleGame(length, width, height)
+            if setup is None:
+                continue
+            game, directions = setup
+            head = game.snakeCoordinates[-1]
+
+            def createNewPrey(iterations: int) -> None:
+                for _ in range(iterations):
+                    game.createNewPrey()
+                game.preyCoordinates = UNREACHABLE_PREY
+
+            def move(iterations: int) -> None:
+                period = len(directions)
+                for i in range(game.ticks, game.ticks + iterations):
+                    game.direction = directions[i % period]
+                    game.move()
+                game.ticks += iterations    # carries the cycle position over to the next run
+
+            def isGameOver(iterations: int) -> None:
+                for _ in range(iterations):
+                    game.isGameOver(head)
+
+            def calculateNewCoordinates(iterations: int) -> None:
+                for _ in range(iterations):
+                    game.calculateNewCoordinates()
+
+            # move goes last as it is the only one changing the snake
+            for operation in (createNewPrey, isGameOver, calculateNewCoordinates, move):
+                game.random.seed(SEED)
+                opsPerSecond = measure(operation, minTime, repeats)
+                results.append({"name": f"Game.{operation.__name__}",
+                                "params": {"length": length, "board": f"{width}x{height}"},
+                                "opsPerSecond": opsPerSecond})
+    return results
+
+
+class NullCanvas():
+    """
+        This class stands in for the tkinter canvas, so the queue
+        handler can be timed without a display.
+    """
+    def coords(self, *args) -> None:
+        pass
+
+    def itemconfigure(self, *args, **kwargs) -> None:
+        pass
+
+
+class NullGui():
+    """
+        This class stands in for part_1.Gui with a NullCanvas.
+    """
+    def __init__(self) -> None:
+        self.canvas = NullCanvas()
+        self.root = mock.Mock()
+        self.snakeIcon = self.preyIcon = self.score = 0
+
+    def gameOver(self) -> None:
+        pass
+
+
+def benchmarkQueueHandler(lengths: tuple[int, ...], threadCounts: tuple[int, ...],
+                          minTime: float, repeats: int) -> list[dict]:
+    """
+        This function times how many move tasks per second the queue
+        handler drains while producer threads keep filling the queue.
+    """
+    import part_1   # needs tkinter, which the other benchmarks don't
+    results = []
+    for length in lengths:
+        snapshot = tuple((5 + 10 * i, 5) for i in range(length))
+        for threads in threadCounts:
+            gameQueue: queue.Queue = queue.Queue()
+            part_1.gameQueue, part_1.gui = gameQueue, NullGui()
+            part_1.game = mock.Mock(renderMode="snapshot")
+            part_1.game.scheduler.tickInterval = 0.15
+            handler = part_1.QueueHandler()
+
+            def drain(iterations: int) -> None:
+                perThread = -(-iterations // threads)
+                def produce() -> None:
+                    for _ in range(perThread):
+                        gameQueue.put({"move": snapshot})
+                producers = [threading.Thread(target=produce) for _ in range(threads)]
+                for producer in producers:
+                    producer.start()
+                while any(producer.is_alive() for producer in producers) or not gameQueue.empty():
+                    handler.queueHandler()
+                for producer in producers:
+                    producer.join()
+
+            results.append({"name": "QueueHandler.queueHandler",
+                            "params": {"length": length, "threads": threads},
+                            "opsPerSecond": measure(drain, minTime, repeats)})
+    return results
+
+
+def benchmarkPipeline(threadCounts: tuple[int, ...], minTime: float, repeats: int) -> list[dict]:
+    """
+        This function times the items per second moved through the
+        part_2 producer/consumer workers, and through the batched
+        pipeline on each backend, with the same number of producers
+        and consumers.
+        The simulated work (sleeps) and the printing are switched off,
+        so only the pipeline is timed.
+    """
+    results = []
+    #stands in for the time module in part_2 only, so the workers' sleeps return at once
+    noSleep = types.SimpleNamespace(sleep=lambda seconds: None)
+    for threads in threadCounts:
+        def pipeline(iterations: int) -> None:
+            buffer: queue.Queue = queue.Queue()
+            part_2.items_per_producer = -(-iterations // threads)
+            part_2.item_range = (1, 100)
+            with mock.patch.object(part_2, "time", noSleep), contextlib.redirect_stdout(io.StringIO()):
+                producers = [threading.Thread(target=part_2.producerWorker, args=(buffer,)) for _ in range(threads)]
+                consumers = [threading.Thread(target=part_2.consumerWorker, args=(buffer,)) for _ in range(threads)]
+                for thread in producers + consumers:
+                    thread.start()
+                for producer in producers:
+                    producer.join()
+                #the consumers stop at the sentinels, after the last item
+                for _ in consumers:
+                    buffer.put(part_2.SENTINEL)
+                for consumer in consumers:
+                    consumer.join()
+
+        random.seed(SEED)
+        results.append({"name": "part_2.pipeline", "params": {"threads": threads},
+                        "opsPerSecond": measure(pipeline, minTime, repeats)})
+
+        for backend, batchSize in (("threads", 1), ("threads", 64), ("processes", 64), ("asyncio", 64)):
+            def batchedPipeline(iterations: int) -> None:
+                part_2.runPipeline(threads, threads, -(-iterations // threads), (1, 100), batchSize, backend=backend)
+
+            params = {"threads": threads, "batchSize": batchSize}
+            if backend != "threads":
+                params["backend"] = backend
+            results.append({"name": "part_2.runPipeline", "params": params,
+                            "opsPerSecond": measure(batchedPipeline, minTime, repeats, minIterations=100_000)})
+    return results
+
+
+def benchmarkAutopilot(boards: tuple[tuple[int, int], ...], minTime: float, repeats: int) -> list[dict]:
+    """
+        This function times how many moves per second the autopilot
+        decides while playing seeded games, a new one whenever the
+        last one ends. Planning, plan reuse and fallbacks all count.
+    """
+    results = []
+    for width, height in boards:
+        config = BoardConfig(width, height)
+        autopilot = Autopilot(config, budget=0.01)
+        seeds = iter(range(SEED, SEED + 1_000_000))
+        game = SnakeEngine(config, random.Random(next(seeds)))
+
+        def decide(iterations: int) -> None:
+            nonlocal game
+            for _ in range(iterations):
+                if not game.gameNotOver:
+                    game = SnakeEngine(config, random.Random(next(seeds)))
+                game.step(autopilot.decide(game))
+
+        results.append({"name": "Autopilot.decide", "params": {"board": f"{width}x{height}"},
+                        "opsPerSecond": measure(decide, minTime, repeats)})
+    return results
+
+
+def resultKey(result: dict) -> str:
+    """
+        This function returns the name and parameters identifying
+        a result across runs.
+    """
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+        This function prints every result next to its baseline and
+        returns the keys of those more than threshold slower.
+    """
+    baselineByKey = {resultKey(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = resultKey(result)
+        if key not in baselineByKey:
+            continue
+        change = result["opsPerSecond"] / baselineByKey[key]["opsPerSecond"] - 1
+        flag = "REGRESSION" if change < -threshold else ""
+        print(f"{key:<70}{change:>+9.1%} {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+        This function parses the command line, runs the benchmarks
+        and saves or compares the results. It returns 1 if the
+        comparison found regressions.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the snake game's hot paths.")
+    parser.add_argument("--output", metavar="PATH", help="save the results as JSON to PATH")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with the baseline JSON in PATH")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown flagged as a regression (default 0.10 = 10%%)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed run")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per benchmark, the best is kept")
+    parser.add_argument("--quick", action="store_true", help="smaller grid of lengths, boards and threads")
+    parser.add_argument("--only", choices=("rules", "queue", "pipeline", "autopilot"), help="run one group of benchmarks")
+    args = parser.parse_args(argv)
+
+    lengths, boards, threadCounts = SNAKE_LENGTHS, BOARD_SIZES, THREAD_COUNTS
+    if args.quick:
+        lengths, boards, threadCounts = (5, 500), BOARD_SIZES[:2], (1, 4)
+    results = []
+    if args.only in (None, "rules"):
+        results += benchmarkRules(lengths, boards, args.min_time, args.repeats)
+    if args.only in (None, "queue"):
+        results += benchmarkQueueHandler(lengths[:3], threadCounts, args.min_time, args.repeats)
+    if args.only in (None, "pipeline"):
+        results += benchmarkPipeline(threadCounts, args.min_time, args.repeats)
+    if args.only in (None, "autopilot"):
+        results += benchmarkAutopilot(boards[:2], args.min_time, args.repeats)
+
+    for result in results:
+        print(f"{resultKey(result):<70}{result['opsPerSecond']:>16,.0f} /s")
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump({"python": sys.version, "platform": platform.platform(), "seed": SEED,
+                       "results": results}, outputFile, indent=2)
+    if args.compare:
+        with open(args.compare) as baselineFile:
+            regressions = compare(results, json.load(baselineFile)["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
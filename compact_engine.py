@@ -0,0 +1,188 @@
+"""
+    This module implements a memory-compact version of SnakeEngine for
+    very large boards, very long snakes and many games per process.
+    The snake body is a ring buffer in a typed array and the occupancy
+    index is one byte per lattice cell of the board, so a game holds no
+    Python object per segment or per cell and its memory grows only
+    with the board size and the snake length.
+"""
+
+from array import array
+from collections.abc import Iterator
+
+from engine import BoardConfig, SnakeEngine
+
+
+class RingBuffer():
+    '''
+        This class holds the snake coordinates, tail first, as (x, y)
+        pairs in a typed array used as a ring buffer. It supports the
+        deque operations SnakeEngine uses and doubles its capacity when
+        full, so its size stays proportional to the snake length.
+    '''
+    __slots__ = ("values", "capacity", "start", "length")
+
+    def __init__(self, coordinates: list[tuple[int, int]], capacity: int = 16) -> None:
+        """
+            The initializer stores the coordinates with room for
+            at least capacity segments.
+        """
+        self.capacity = max(capacity, len(coordinates))
+        self.values = array("i", bytes(8 * self.capacity))
+        self.start = 0      # slot of the tail
+        self.length = 0
+        for coordinate in coordinates:
+            self.append(coordinate)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("ring buffer index out of range")
+        slot = 2 * ((self.start + index) % self.capacity)
+        return (self.values[slot], self.values[slot + 1])
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for index in range(self.length):
+            yield self[index]
+
+    def grow(self) -> None:
+        """
+            This method doubles the capacity, keeping the order.
+        """
+        coordinates = list(self)
+        self.capacity *= 2
+        self.values = array("i", bytes(8 * self.capacity))
+        self.start = self.length = 0
+        for coordinate in coordinates:
+            self.append(coordinate)
+
+    def append(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method adds a coordinate at the head end.
+        """
+        if self.length == self.capacity:
+            self.grow()
+        slot = 2 * ((self.start + self.length) % self.capacity)
+        self.values[slot], self.values[slot + 1] = coordinate
+        self.length += 1
+
+    def appendleft(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method adds a coordinate at the tail end.
+        """
+        if self.length == self.capacity:
+            self.grow()
+        self.start = (self.start - 1) % self.capacity
+        self.values[2 * self.start], self.values[2 * self.start + 1] = coordinate
+        self.length += 1
+
+    def popleft(self) -> tuple[int, int]:
+        """
+            This method removes and returns the tail coordinate.
+        """
+        coordinate = self[0]
+        self.start = (self.start + 1) % self.capacity
+        self.length -= 1
+        return coordinate
+
+    def nbytes(self) -> int:
+        """
+            This method returns the size of the buffer in bytes.
+        """
+        return self.values.itemsize * len(self.values)
+
+
+class OccupancyGrid():
+    '''
+        This class counts the snake segments on each lattice cell of the
+        board in a bytearray. It supports the Counter operations
+        SnakeEngine uses. Coordinates off the board (a tail grown past a
+        wall) are not counted: they can neither be bitten nor block prey.
+    '''
+    __slots__ = ("counts", "cell")
+
+    def __init__(self, config: BoardConfig) -> None:
+        """
+            The initializer creates an empty grid for the board's lattice.
+        """
+        self.counts = bytearray(config.columns * config.rows)
+        #index of the cell at a coordinate, -1 off the lattice
+        self.cell = config.cell
+
+    def __getitem__(self, coordinate: tuple[int, int]) -> int:
+        cell = self.cell(coordinate)
+        return self.counts[cell] if cell >= 0 else 0
+
+    def __contains__(self, coordinate: tuple[int, int]) -> bool:
+        cell = self.cell(coordinate)
+        return cell >= 0 and self.counts[cell] > 0
+
+    def add(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method counts one more segment on coordinate.
+        """
+        cell = self.cell(coordinate)
+        if cell >= 0:
+            self.counts[cell] += 1
+
+    def remove(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method counts one segment less on coordinate.
+        """
+        cell = self.cell(coordinate)
+        if cell >= 0:
+            self.counts[cell] -= 1
+
+    def nbytes(self) -> int:
+        """
+            This method returns the size of the grid in bytes.
+        """
+        return len(self.counts)
+
+
+class CompactSnakeEngine(SnakeEngine):
+    '''
+        This class plays by the same rules as SnakeEngine, with the snake
+        body in a RingBuffer and the occupancy index in an OccupancyGrid.
+        It trades some speed per tick for a small, predictable footprint.
+    '''
+    __slots__ = ()
+
+    def createBody(self, coordinates: list[tuple[int, int]]) -> RingBuffer:
+        """
+            This method returns a RingBuffer holding the coordinates.
+        """
+        return RingBuffer(coordinates)
+
+    def createOccupancy(self) -> OccupancyGrid:
+        """
+            This method returns an empty OccupancyGrid for the board.
+        """
+        return OccupancyGrid(self.config)
+
+    def occupyCell(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method records that a snake segment now sits on
+            the given coordinate in the occupancy grid.
+        """
+        self.occupiedCells.add(coordinate)
+
+    def vacateCell(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method records that a snake segment has left
+            the given coordinate.
+        """
+        self.occupiedCells.remove(coordinate)
+
+    def memoryUsage(self) -> dict[str, int]:
+        """
+            This method returns the bytes held by the snake body
+            and the occupancy grid.
+        """
+        body = self.snakeCoordinates.nbytes()
+        occupancy = self.occupiedCells.nbytes()
+        return {"body": body, "occupancy": occupancy, "total": body + occupancy}
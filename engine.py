@@ -0,0 +1,371 @@
+"""
+    This module implements the rules of the snake game without any
+    graphic user interface, so that games can be simulated headless
+    (for batch runs, load tests and regression checks) as fast as
+    the CPU allows. It deliberately imports no GUI modules.
+    The Game class in part_1 builds on SnakeEngine and adds the
+    queue and timing needed by the tkinter interface.
+"""
+
+import itertools
+import random
+import sys
+from collections import Counter, deque
+
+#the four movement directions, named after the tkinter arrow keys
+DIRECTIONS = ("Left", "Right", "Up", "Down")
+#the direction that would make the snake reverse into itself
+OPPOSITE_DIRECTIONS = {"Left": "Right", "Right": "Left", "Up": "Down", "Down": "Up"}
+#starting tail of the snake; the head is 4 segments left of it
+START_X, START_Y = 495, 55
+
+
+class BoardConfig():
+    """
+        This class holds the board and icon sizes a game is played with.
+        The defaults match the constants of the tkinter game in part_1.
+    """
+    def __init__(self, windowWidth: int = 500, windowHeight: int = 300,
+                 snakeIconWidth: int = 15, preyIconWidth: int = 10,
+                 threshold: int = 15) -> None:
+        """
+            The initializer stores the window size, the icon widths and
+            the THRESHOLD that sets how close prey can be to the borders.
+        """
+        self.windowWidth = windowWidth
+        self.windowHeight = windowHeight
+        self.snakeIconWidth = snakeIconWidth
+        self.preyIconWidth = preyIconWidth
+        self.threshold = threshold
+        #the lattice the snake moves on: every segment lies on x = xOrigin + step * column,
+        #y = yOrigin + step * row, with step the prey icon width
+        self.xOrigin = START_X % preyIconWidth
+        self.yOrigin = START_Y % preyIconWidth
+        self.columns = (windowWidth - 1 - self.xOrigin) // preyIconWidth + 1
+        self.rows = (windowHeight - 1 - self.yOrigin) // preyIconWidth + 1
+
+    def cell(self, coordinate: tuple[int, int]) -> int:
+        """
+            This method returns the index (row by row) of the lattice
+            cell at coordinate, or -1 if it is not a cell inside the board.
+        """
+        x, y = coordinate
+        column, xOffset = divmod(x - self.xOrigin, self.preyIconWidth)
+        row, yOffset = divmod(y - self.yOrigin, self.preyIconWidth)
+        if xOffset or yOffset or x <= 0 or y <= 0 or column >= self.columns or row >= self.rows:
+            return -1
+        return row * self.columns + column
+
+    def coordinate(self, column: int, row: int) -> tuple[int, int]:
+        """
+            This method returns the coordinate of a lattice cell.
+        """
+        return self.xOrigin + column * self.preyIconWidth, self.yOrigin + row * self.preyIconWidth
+
+
+class SnakeEngine():
+    '''
+        This class implements the game rules: moving the snake, eating
+        prey, growing and checking if the game is over.
+        It uses __slots__ so that many headless games fit in a process.
+    '''
+    __slots__ = ("config", "random", "score", "ticks", "causeOfDeath", "snakeCoordinates",
+                 "occupiedCells", "direction", "gameNotOver", "preyCoordinates")
+
+    def __init__(self, config: BoardConfig | None = None,
+                 rng: random.Random | None = None) -> None:
+        """
+           This initializer sets the initial snake coordinate list, movement
+           direction, and arranges for the first prey to be created.
+           Pass a seeded random.Random as rng to make a game reproducible.
+        """
+        self.config = config if config is not None else BoardConfig()
+        self.random = rng if rng is not None else random.Random()
+        self.score = 0
+        self.ticks = 0
+        #why the game ended: "wall", "self" or "board_full" (None while playing)
+        self.causeOfDeath: str | None = None
+        preyIconWidth = self.config.preyIconWidth
+        #starting length and location of the snake
+        #note that it is a deque of tuples, each being an
+        # (x, y) tuple. Initially its size is 5 tuples.
+        # Last tuple represents snake head. A deque lets the
+        # head be added and the tail dropped or grown in O(1)
+        self.snakeCoordinates: deque[tuple[int, int]] = self.createBody(
+                                [(START_X, START_Y), (START_X-preyIconWidth, START_Y), (START_X-2*preyIconWidth, START_Y),
+                                 (START_X-3*preyIconWidth, START_Y), (START_X-4*preyIconWidth, START_Y)])
+        #occupancy index of the snake body: maps each (x, y) segment to the
+        # number of segments sitting on it. move() keeps it up to date so
+        # createNewPrey and isGameOver never have to scan the coordinates
+        self.occupiedCells: Counter[tuple[int, int]] = self.createOccupancy()
+        for coordinate in self.snakeCoordinates:
+            self.occupyCell(coordinate)
+        #initial direction of the snake
+        self.direction = "Left"
+        self.gameNotOver = True
+        self.createNewPrey()
+
+    def createBody(self, coordinates: list[tuple[int, int]]) -> deque[tuple[int, int]]:
+        """
+            This method returns the container holding the snake
+            coordinates, tail first.
+        """
+        return deque(coordinates)
+
+    def createOccupancy(self) -> Counter[tuple[int, int]]:
+        """
+            This method returns an empty occupancy index.
+        """
+        return Counter()
+
+    def memoryUsage(self) -> dict[str, int]:
+        """
+            This method returns an estimate in bytes of the memory
+            held by the snake body and the occupancy index.
+            It walks every segment, so it is meant for reports only.
+        """
+        body = sys.getsizeof(self.snakeCoordinates) + sum(
+            sys.getsizeof(coordinate) + sys.getsizeof(coordinate[0]) + sys.getsizeof(coordinate[1])
+            for coordinate in self.snakeCoordinates)
+        occupancy = sys.getsizeof(self.occupiedCells)  # its keys are shared with the body
+        return {"body": body, "occupancy": occupancy, "total": body + occupancy}
+
+    def publish(self, task: dict) -> None:
+        """
+            This method is called with every "prey", "score" and
+            "game_over" task the game produces. Headless games have
+            nobody to tell, so it does nothing; the GUI game overrides
+            it to put the task in its queue.
+        """
+
+    def step(self, direction: str | None = None) -> bool:
+        """
+            This method advances the game by one tick, first turning
+            the snake to direction if given. Turns that would reverse
+            the snake into itself are ignored, like the arrow keys.
+            It returns whether the game is still running.
+        """
+        if direction is not None and direction != OPPOSITE_DIRECTIONS[self.direction]:
+            self.direction = direction
+        self.move()
+        self.ticks += 1
+        return self.gameNotOver
+
+    def move(self) -> None:
+        """
+            This method implements what is needed to be done
+            for the movement of the snake.
+            It generates a new snake coordinate.
+            If based on this new movement, the prey has been
+            captured, it publishes a task for the updated
+            score and also creates a new prey.
+            It also calls a corresponding method to check if
+            the game should be over.
+            The snake coordinates list (representing its length
+            and position) should be correctly updated.
+        """
+        PREY_ICON_WIDTH = self.config.preyIconWidth
+        SNAKE_ICON_WIDTH = self.config.snakeIconWidth
+        newSnakeCoordinates = self.calculateNewCoordinates()
+
+        # update sefl.SnakeCoordinates list with new coordinates by:
+        # adding new coordinate at head, removing coordinate at tail - equivalent to shifting snake in specified direction
+        self.snakeCoordinates.append(newSnakeCoordinates) # add new snake head coordinate
+        self.occupyCell(newSnakeCoordinates)
+        self.vacateCell(self.snakeCoordinates.popleft()) # remove tail
+
+        preyEaten: bool = False # track if prey is eaten
+
+        # first check if the snake head has "eaten" or touched the prey icon
+        xDistPreySnake: int = newSnakeCoordinates[0] - self.preyCoordinates[0] # x distance between left side of prey icon and snake head
+        yDistPreySnake: int = newSnakeCoordinates[1] - self.preyCoordinates[1] # y distance between top side of prey icon and snake head
+
+        if self.direction == "Up" or self.direction == "Down": # if snake moving vertically
+            # whenever snake head begins to touch prey icon/is touching prey icon on vertical axis, counts as prey touching vertically
+            if yDistPreySnake <= PREY_ICON_WIDTH and yDistPreySnake >= 0:
+                # on horizontal axis, allow extra tolerance distance and still count as prey touching
+                if xDistPreySnake <= PREY_ICON_WIDTH+abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH) and xDistPreySnake >= -abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH):
+                    preyEaten = True
+        else: # if snake is moving horizontally
+            # whenever snake head begins to touch prey icon/is touching prey icon on horizontal axis, counts as prey touching horizontally
+            if xDistPreySnake <= PREY_ICON_WIDTH and xDistPreySnake >= 0:
+                # on vertical axis, allow extra tolerance distance and still  count as prey touching
+                if yDistPreySnake <= PREY_ICON_WIDTH+abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH) and yDistPreySnake >= -abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH):
+                    preyEaten = True
+
+        # if prey is eaten, increase score and length of snake
+        if preyEaten:
+            self.score += 1 # 1 prey eaten means1 point increase in score
+            self.publish({"score": self.score}) # display the new score
+
+            # increase the length of the snake
+            addLength: tuple = () # coordinate added to increase length of snake
+
+            # determine the position of this new coordinate to add
+            if self.snakeCoordinates[0][0] == self.snakeCoordinates[1][0]: # check if first 2 snake coordinates are on the same line vertically
+                                                                            # first coordinate = snake tail
+                # if so, check if snake tail points down or up, adding new length at pointing open end
+                if self.snakeCoordinates[0][1] > self.snakeCoordinates[1][1]:
+                    # if open tail end points up (snake tail y coordinate greater than y coordinate of tuple next to snake tail)
+                    addLength = (self.snakeCoordinates[0][0], self.snakeCoordinates[0][1] + PREY_ICON_WIDTH)
+                else: # otherwise tail end points down, add length below
+                    addLength = (self.snakeCoordinates[0][0], self.snakeCoordinates[0][1] - PREY_ICON_WIDTH)
+            else: # otherwise first 2 snake coordinates are on the same line horizontally
+                 # check if snake tail points right or left, adding new length at pointing open end
+                if self.snakeCoordinates[0][0] > self.snakeCoordinates[1][0]:
+                    # if open tail end points right (snake tail x-coordinate greater than x-coordinate of tuple next to snake tail)
+                    addLength = (self.snakeCoordinates[0][0] + PREY_ICON_WIDTH, self.snakeCoordinates[0][1])
+                else: # otherwise tail end points left, add length left
+                    addLength = (self.snakeCoordinates[0][0] - PREY_ICON_WIDTH, self.snakeCoordinates[0][1])
+
+            self.snakeCoordinates.appendleft(addLength) # add the new length the snake gained from eating prey to tail-end
+            self.occupyCell(addLength)
+            self.createNewPrey() # generate a new prey
+
+        # check if game is over, passing coordinates of snake head
+        self.isGameOver(newSnakeCoordinates)
+
+    def calculateNewCoordinates(self) -> tuple[int, int]:
+        """
+            This method calculates and returns the new
+            coordinates to be added to the snake
+            coordinates list based on the movement
+            direction and the current coordinate of
+            head of the snake.
+            It is used by the move() method.
+        """
+        PREY_ICON_WIDTH = self.config.preyIconWidth
+        lastX, lastY = self.snakeCoordinates[-1] # represents snake head
+        newX: int = lastX # represents new x coordinate to be added
+        newY: int = lastY # represents new y coordinate to be added
+
+        if self.direction == "Right":
+            newX += PREY_ICON_WIDTH # move to the right
+        elif self.direction == "Left":
+            newX -= PREY_ICON_WIDTH # move to the left
+        elif self.direction == "Up":
+            newY -= PREY_ICON_WIDTH # move up
+        elif self.direction == "Down":
+            newY += PREY_ICON_WIDTH # move down
+
+        return (newX, newY)
+
+    def isGameOver(self, snakeCoordinates: tuple[int, int]) -> None:
+        """
+            This method checks if the game is over by
+            checking if now the snake has passed any wall
+            or if it has bit itself.
+            If that is the case, it updates the gameNotOver
+            field and also publishes a "game_over" task.
+        """
+        x, y = snakeCoordinates # coordinates of snake head
+
+        # check if snake hit any of left or right walls or top or bottom walls
+        # use >= <= to account for latency, so as long as the snake head touches any point outside game window = game over
+        if x >= self.config.windowWidth or x <= 0 or y >= self.config.windowHeight or y <= 0:
+            self.gameNotOver = False
+            self.causeOfDeath = "wall"
+        # if the snake head coordinate is equal to any other snake coordinate, then snake bit itself
+        else:
+            # check if snake head matches any tuples in snakeCoordinates using the occupancy index
+            # the head itself accounts for one entry, so any further entry is another segment
+            if self.occupiedCells[(x, y)] > 1:
+                self.gameNotOver = False
+                self.causeOfDeath = "self"
+
+        if not self.gameNotOver:
+            self.publish({"game_over": self.gameNotOver})
+
+    def occupyCell(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method records that a snake segment now sits on
+            the given coordinate in the occupancy index.
+        """
+        self.occupiedCells[coordinate] += 1
+
+    def vacateCell(self, coordinate: tuple[int, int]) -> None:
+        """
+            This method records that a snake segment has left
+            the given coordinate. Coordinates no longer covered by
+            any segment are removed so membership tests stay exact.
+        """
+        count = self.occupiedCells[coordinate] - 1
+        if count > 0:
+            self.occupiedCells[coordinate] = count
+        else:
+            del self.occupiedCells[coordinate]
+
+    def isFreePreyCell(self, x: int, y: int) -> bool:
+        """
+            This method checks if a prey may be generated at (x, y).
+            The coordinate must not be on the score text and must not
+            be within the snake icon width of any snake segment.
+        """
+        # Accounting for score text
+        scoreWidth: int = 55  # approximated + buffer
+        scoreHeight: int = 15 # approximated + buffer
+        # We should avoid generating prey on score text (0, 0) to (60 + scoreWidth, 15 + scoreHeight) (as config)
+        if (x, y) < (60 + scoreWidth, 15 + scoreHeight):
+            return False
+
+        # Account for the width of the snake icon and prey icon (such that no overlap should occur):
+        # (x, y) is covered if a segment lies within buffer pixels of it on the same row or column
+        buffer = (self.config.snakeIconWidth - self.config.preyIconWidth) // 2
+        occupiedCells = self.occupiedCells
+        for i in range(-buffer, buffer + 1):
+            if (x, y + i) in occupiedCells or (x + i, y) in occupiedCells:
+                return False
+        return True
+
+    def createNewPrey(self) -> None:
+        """
+            This methods picks an x and a y randomly as the coordinate
+            of the new prey and uses that to calculate the
+            coordinates (x - PREY_ICON_WIDTH / 2, y - PREY_ICON_WIDTH / 2,
+            x + PREY_ICON_WIDTH / 2, y + PREY_ICON_WIDTH / 2).
+            It then publishes a "prey" task with the calculated
+            rectangle coordinates as its value. This is used by the
+            queue handler to represent the new prey.
+            To make playing the game easier, set the x and y to be THRESHOLD
+            away from the walls.
+            In addiction, the prey should not be generated on the score text and on the snake.
+            Candidates are drawn at random and checked against the occupancy
+            index, so placement takes expected constant time; only a nearly
+            full board falls back to scanning every free coordinate.
+        """
+        THRESHOLD = self.config.threshold   #sets how close prey can be to borders
+        MAX_SAMPLE_ATTEMPTS = 64   #random draws before falling back to a full scan
+        PREY_ICON_WIDTH = self.config.preyIconWidth
+        WINDOW_WIDTH = self.config.windowWidth
+        WINDOW_HEIGHT = self.config.windowHeight
+
+        # generate x, y integer coordinates of prey randomly and make sure they account for border threshold
+        # rejection sampling keeps the choice uniform over the free coordinates
+        for _ in range(MAX_SAMPLE_ATTEMPTS):
+            xCoordinate = self.random.randrange(THRESHOLD, WINDOW_WIDTH-THRESHOLD)
+            yCoordinate = self.random.randrange(THRESHOLD, WINDOW_HEIGHT-THRESHOLD)
+            if self.isFreePreyCell(xCoordinate, yCoordinate):
+                break
+        else:
+            # board is nearly full, so count the remaining possible prey coordinates
+            # and pick one by index, without holding them all in memory
+            def possiblePreyCoordinates():
+                return ((x, y) for x in range(THRESHOLD, WINDOW_WIDTH-THRESHOLD)
+                        for y in range(THRESHOLD, WINDOW_HEIGHT-THRESHOLD)
+                        if self.isFreePreyCell(x, y))
+            freeCount = sum(1 for _ in possiblePreyCoordinates())
+            if not freeCount:
+                # nowhere left to put prey, the game cannot continue
+                self.gameNotOver = False
+                self.causeOfDeath = "board_full"
+                return
+            # randrange(n) draws like choice() on n items, so seeded games are unchanged
+            xCoordinate, yCoordinate = next(itertools.islice(possiblePreyCoordinates(),
+                                                             self.random.randrange(freeCount), None))
+
+        # generate rectangular prey coordinates using the formula specified in documentation
+        self.preyCoordinates: tuple = (xCoordinate - PREY_ICON_WIDTH / 2, yCoordinate - PREY_ICON_WIDTH / 2,
+                                xCoordinate + PREY_ICON_WIDTH / 2, yCoordinate + PREY_ICON_WIDTH / 2)
+
+        # publish coordinates of new prey
+        self.publish({"prey": self.preyCoordinates})
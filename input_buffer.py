@@ -0,0 +1,112 @@
+"""
+    This module implements the buffer that carries turns from the thread
+    reading the keys (or the network) to the game loop, one turn per tick.
+
+    Key presses used to overwrite the snake's direction directly, so two
+    presses within one tick collapsed into the last one, and a quick turn
+    such as Up then Left while moving Right could be refused as a reversal
+    of a direction that was never applied. The buffer keeps the turns in
+    order instead. A press that repeats or reverses the turn queued before
+    it is ignored when pushed, and the game applies the next turn that is
+    valid against the direction it last applied.
+
+    Every turn carries the time it was pressed, so the latency from the
+    press to the move that applied it and to the frame that showed it
+    can be measured.
+"""
+
+import time
+from collections import deque
+from collections.abc import Callable
+
+from engine import OPPOSITE_DIRECTIONS
+from instrumentation import Histogram
+
+
+class InputBuffer():
+    """
+        This class is a bounded buffer of timestamped turns for one
+        producer thread and one consumer thread. It takes no lock:
+        deque.append and deque.popleft are atomic, and as only the
+        producer appends, the length it checks can only shrink before
+        its append, so the buffer never exceeds its capacity.
+    """
+    def __init__(self, capacity: int = 4, applied: Histogram | None = None,
+                 rendered: Histogram | None = None,
+                 clock: Callable[[], int] = time.perf_counter_ns) -> None:
+        """
+            The initializer creates an empty buffer holding at most
+            capacity turns. The latencies (ns) from a press to the move
+            applying it and to the frame showing it are recorded in
+            applied and rendered.
+        """
+        self.capacity = capacity
+        self.clock = clock
+        self.turns: deque[tuple[str, int]] = deque()
+        self.applied = applied if applied is not None else Histogram()
+        self.rendered = rendered if rendered is not None else Histogram()
+        self.pushed = 0     # counted by the producer
+        self.dropped = 0    # counted by the producer
+        self.ignored = 0    # counted by the producer
+        self.rejected = 0   # counted by the consumer
+
+    def push(self, direction: str, pressedAt: int | None = None) -> bool:
+        """
+            This method queues a turn, timestamped now unless pressedAt
+            (a clock() value) is given. It is called by the producer and
+            returns False if the turn was ignored, as it repeats or
+            reverses the last queued turn, or dropped, as the buffer was
+            full.
+        """
+        if pressedAt is None:
+            pressedAt = self.clock()
+        try:
+            lastDirection = self.turns[-1][0]
+        except IndexError:  # nothing queued, or the consumer took the last turn meanwhile
+            lastDirection = None
+        if lastDirection is not None and direction in (lastDirection, OPPOSITE_DIRECTIONS[lastDirection]):
+            self.ignored += 1
+            return False
+        if len(self.turns) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.turns.append((direction, pressedAt))
+        self.pushed += 1
+        return True
+
+    def next(self, lastDirection: str) -> tuple[str, int] | None:
+        """
+            This method returns the next queued turn that changes
+            lastDirection, the direction applied last, without reversing
+            it, with its press time, or None if there is none. Turns
+            skipped on the way are discarded. It is called by the consumer
+            once per tick.
+        """
+        while self.turns:
+            direction, pressedAt = self.turns.popleft()
+            if direction != lastDirection and direction != OPPOSITE_DIRECTIONS[lastDirection]:
+                return direction, pressedAt
+            self.rejected += 1
+        return None
+
+    def recordApplied(self, pressedAt: int) -> None:
+        """
+            This method records the latency of a turn that has just
+            been applied to a move. It is called by the consumer.
+        """
+        self.applied.add(max(0, self.clock() - pressedAt))
+
+    def recordRendered(self, pressedAt: int) -> None:
+        """
+            This method records the latency of a turn whose move has
+            just been drawn. It is called by the thread rendering.
+        """
+        self.rendered.add(max(0, self.clock() - pressedAt))
+
+    def report(self) -> dict:
+        """
+            This method returns the turn counts and the latency (ns)
+            summaries. Turns ignored when pushed count as rejected.
+        """
+        return {"pushed": self.pushed, "dropped": self.dropped, "rejected": self.ignored + self.rejected,
+                "applied": self.applied.summary(), "rendered": self.rendered.summary()}
@@ -0,0 +1,275 @@
+"""
+    This module implements timing instrumentation for the game's hot
+    paths. A Profiler wraps the methods it is asked to instrument on
+    individual objects and records their durations in log2-bucketed
+    histograms; objects it was never asked to instrument run unchanged,
+    so turning instrumentation off costs nothing.
+    It can also track the depth of the game queue and the latency from
+    enqueueing a task to rendering it, run a session under cProfile and
+    dump everything as JSON or a text report.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import pstats
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+
+class Histogram():
+    """
+        This class counts values (nanoseconds or queue depths) in
+        power-of-two buckets, which is cheap enough for every call.
+    """
+    def __init__(self) -> None:
+        self.counts = [0] * 65
+        self.count = 0
+        self.total = 0
+        self.minimum = 0
+        self.maximum = 0
+
+    def add(self, value: int) -> None:
+        """
+            This method records one value.
+        """
+        self.counts[value.bit_length()] += 1
+        if not self.count or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction: float) -> int:
+        """
+            This method returns an upper bound of the given percentile
+            (0 to 1): the top of the bucket it falls in.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for bits, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min((1 << bits) - 1, self.maximum)
+        return self.maximum
+
+    def summary(self) -> dict:
+        """
+            This method returns the count, mean, extremes and
+            percentiles of the values.
+        """
+        return {"count": self.count, "mean": self.total / self.count if self.count else 0,
+                "min": self.minimum, "max": self.maximum, "p50": self.percentile(0.5),
+                "p90": self.percentile(0.9), "p99": self.percentile(0.99),
+                "buckets": {f"<{1 << bits}": count for bits, count in enumerate(self.counts) if count}}
+
+
+class Profiler():
+    """
+        This class collects the histograms of one game session, and
+        the statistics other components keep themselves.
+    """
+    def __init__(self) -> None:
+        self.histograms: dict[str, Histogram] = {}
+        #functions returning the statistics of other components, by name
+        self.statsSources: dict[str, Callable[[], dict]] = {}
+        self.profiles: list[cProfile.Profile] = []
+        self.lock = threading.Lock()    # histograms are created from the game and gui threads
+
+    def histogram(self, name: str) -> Histogram:
+        """
+            This method returns the histogram called name,
+            creating it the first time.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def addStats(self, name: str, source: Callable[[], dict]) -> None:
+        """
+            This method adds the dict returned by source, such as a
+            scheduler's stats(), to every report under name.
+        """
+        with self.lock:
+            self.statsSources[name] = source
+
+    def instrument(self, target: object, methodNames: tuple[str, ...],
+                   after: Callable[[], None] | None = None) -> None:
+        """
+            This method replaces the named methods of target (on that
+            object only) with wrappers timing every call into a histogram
+            called "ClassName.method". after, if given, is called after
+            every call of the wrappers.
+        """
+        for methodName in methodNames:
+            method = getattr(target, methodName)
+            histogram = self.histogram(f"{type(target).__name__}.{methodName}")
+            setattr(target, methodName, self.timed(method, histogram, after))
+
+    @staticmethod
+    def timed(method: Callable, histogram: Histogram, after: Callable[[], None] | None) -> Callable:
+        """
+            This method returns a wrapper of method recording its
+            duration in nanoseconds.
+        """
+        clock = time.perf_counter_ns
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.add(clock() - start)
+                if after is not None:
+                    after()
+        return wrapper
+
+    def recordRenderLatency(self, gameQueue: "InstrumentedQueue") -> None:
+        """
+            This method records, per task type, how long the tasks taken
+            from gameQueue since the last call waited until now, when
+            they have been rendered.
+        """
+        now = time.perf_counter_ns()
+        while gameQueue.taken:
+            taskType, enqueuedAt = gameQueue.taken.popleft()
+            self.histogram(f"latency.{taskType}").add(now - enqueuedAt)
+
+    def startProfiling(self) -> None:
+        """
+            This method profiles the calling thread, and the threads it
+            starts later, under cProfile until stopProfiling is called.
+            From Python 3.12 cProfile is built on sys.monitoring, which
+            sees every thread but allows a single profiler at a time, so
+            one profile covers the session. Before that it only sees the
+            thread that enabled it, so every new thread enables its own.
+        """
+        if sys.version_info < (3, 12):
+            threading.setprofile(lambda *_: self.enableProfile())
+        self.enableProfile()
+
+    def enableProfile(self) -> None:
+        """
+            This method starts a profile in the calling thread
+            and keeps it for the report.
+        """
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def stopProfiling(self) -> None:
+        """
+            This method stops the profiles started by startProfiling.
+            It should be called once the profiled threads have ended.
+        """
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)
+        with self.lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            profile.disable()
+
+    def report(self) -> dict:
+        """
+            This method returns the summaries of all histograms,
+            followed by the statistics of the added sources.
+        """
+        report = self.histogramReport()
+        with self.lock:
+            sources = dict(self.statsSources)
+        report.update((name, source()) for name, source in sources.items())
+        return report
+
+    def histogramReport(self) -> dict:
+        """
+            This method returns the summaries of all histograms.
+        """
+        with self.lock:
+            histograms = dict(self.histograms)
+        return {name: histograms[name].summary() for name in sorted(histograms)}
+
+    def textReport(self) -> str:
+        """
+            This method returns the histograms as a text table, followed
+            by the statistics of the added sources and the top functions
+            of the cProfile profiles if any. Durations are in microseconds.
+        """
+        lines = [f"{'name':<28}{'count':>9}{'mean':>11}{'p50':>11}{'p90':>11}{'p99':>11}{'max':>11}"]
+        for name, summary in self.histogramReport().items():
+            scale = 1 if name.startswith("queue.") else 1000  # depths are counts, the rest ns
+            values = [summary[key] / scale for key in ("mean", "p50", "p90", "p99", "max")]
+            lines.append(f"{name:<28}{summary['count']:>9}" + "".join(f"{value:>11.1f}" for value in values))
+        with self.lock:
+            sources = dict(self.statsSources)
+        for name, source in sources.items():
+            stats = source()    # floats are seconds, shown in microseconds like the table
+            lines.append(f"{name}: " + ", ".join(f"{key} {value * 1e6:.1f}" if isinstance(value, float)
+                                                  else f"{key} {value}" for key, value in stats.items()))
+        if self.profiles:
+            stream = io.StringIO()
+            stats = pstats.Stats(*self.profiles, stream=stream)
+            stats.sort_stats("cumulative").print_stats(25)
+            lines.append(stream.getvalue())
+        return "\n".join(lines)
+
+    def dump(self, path: str | None = None) -> None:
+        """
+            This method writes the report to path, as JSON if path ends
+            in .json and as text otherwise, or to stderr without a path.
+        """
+        if path is None:
+            print(self.textReport(), file=sys.stderr)
+        elif path.endswith(".json"):
+            with open(path, "w") as reportFile:
+                json.dump(self.report(), reportFile, indent=2)
+        else:
+            with open(path, "w") as reportFile:
+                reportFile.write(self.textReport())
+
+    def dumpOnSignal(self, signalNumber: int | None = getattr(signal, "SIGUSR1", None),
+                     path: str | None = None) -> None:
+        """
+            This method dumps the report whenever the process receives
+            the given signal (SIGUSR1 by default). Where there is no
+            SIGUSR1 (Windows) nothing is installed, rather than taking
+            over another signal such as Ctrl+C. It must be called from
+            the main thread.
+        """
+        if signalNumber is not None:
+            signal.signal(signalNumber, lambda *_: self.dump(path))
+
+
+class InstrumentedQueue(queue.Queue):
+    """
+        This class is a queue.Queue that records its depth after every
+        put and remembers when each task was enqueued, so the profiler
+        can measure how long tasks take to be rendered.
+    """
+    def __init__(self, profiler: Profiler, maxsize: int = 0) -> None:
+        super().__init__(maxsize)
+        self.depth = profiler.histogram("queue.depth")
+        self.enqueuedAt: deque[int] = deque()
+        #(task type, enqueue time) of the tasks taken but not yet rendered
+        self.taken: deque[tuple[str, int]] = deque()
+
+    def _put(self, item: dict) -> None:
+        # called by put() with the queue's lock held
+        super()._put(item)
+        self.enqueuedAt.append(time.perf_counter_ns())
+        self.depth.add(len(self.queue))
+
+    def _get(self) -> dict:
+        # called by get() with the queue's lock held
+        item = super()._get()
+        self.taken.append((next(iter(item)), self.enqueuedAt.popleft()))
+        return item
@@ -0,0 +1,248 @@
+"""
+    This program load-tests server.py with many simulated clients:
+
+        python loadtest.py --clients 2000 --duration 30 --local
+
+    Every client plays its game with tournament.greedyBot on a mirror of
+    the game state it rebuilds from the deltas it receives, and starts a
+    new game when one ends, until the test is over. With --local the
+    server is started in a separate process, so it doesn't share a core
+    with the clients. At the end it reports the tick throughput, the
+    jitter between ticks, the latency from sending a turn to seeing it
+    applied and how the sessions ended.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import time
+from collections import Counter, deque
+
+import server
+from engine import BoardConfig
+from instrumentation import Histogram
+from replay import DIRECTION_CODES, KEYFRAME, decodeKeyframe, keyframeSize
+from tournament import greedyBot
+
+
+
+class MirrorGame():
+    """
+        This class holds a client's copy of its game, with the attributes
+        greedyBot reads, kept up to date from the server's deltas.
+    """
+    __slots__ = ("config", "snakeCoordinates", "occupiedCells", "direction", "preyCoordinates", "score")
+
+    def __init__(self, config: BoardConfig, snapshot: bytes) -> None:
+        """
+            The initializer sets the state from a SNAPSHOT keyframe.
+        """
+        self.config = config
+        _, self.score, self.direction, body, self.preyCoordinates = decodeKeyframe(snapshot, 0, config.preyIconWidth)
+        self.snakeCoordinates = deque(body)
+        self.occupiedCells = Counter(body)
+
+    def applyTick(self, head: tuple[int, int], grownTail: tuple[int, int] | None) -> str:
+        """
+            This method moves the snake to its new head, growing it by
+            grownTail if given, and returns the direction it moved in.
+        """
+        lastX, lastY = self.snakeCoordinates[-1]
+        self.direction = ("Right" if head[0] > lastX else "Left" if head[0] < lastX else
+                          "Down" if head[1] > lastY else "Up")
+        self.snakeCoordinates.append(head)
+        self.occupiedCells[head] += 1
+        tail = self.snakeCoordinates.popleft()
+        self.occupiedCells[tail] -= 1
+        if not self.occupiedCells[tail]:
+            del self.occupiedCells[tail]
+        if grownTail is not None:
+            self.snakeCoordinates.appendleft(grownTail)
+            self.occupiedCells[grownTail] += 1
+        return self.direction
+
+
+class LoadStats():
+    """
+        This class collects the measurements of all simulated clients.
+    """
+    def __init__(self) -> None:
+        self.ticks = 0
+        self.bytes = 0
+        self.games = 0
+        self.refused = 0
+        self.errors = 0
+        self.endings: Counter[str] = Counter()
+        #deviation (ns) of the time between two ticks from the tick interval
+        self.jitter = Histogram()
+        #time (ns) from sending a turn to receiving the tick that applied it
+        self.turnLatency = Histogram()
+
+
+async def playGame(host: str, port: int, stats: LoadStats, decisionRate: float, rng: random.Random) -> None:
+    """
+        This function connects to the server and plays one game to its
+        end, steering with greedyBot on decisionRate of the ticks.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        try:
+            welcome = await reader.readexactly(server.WELCOME.size)
+        except asyncio.IncompleteReadError:
+            stats.refused += 1  # the server is full
+            return
+        _, _, _, width, height, snakeIconWidth, preyIconWidth, threshold, tickInterval = server.WELCOME.unpack(welcome)
+        config = BoardConfig(width, height, snakeIconWidth, preyIconWidth, threshold)
+        await reader.readexactly(server.SNAPSHOT.size)
+        keyframe = await reader.readexactly(KEYFRAME.size)
+        keyframe += await reader.readexactly(keyframeSize(keyframe, 0) - KEYFRAME.size)
+        game = MirrorGame(config, keyframe)
+        stats.bytes += len(welcome) + server.SNAPSHOT.size + len(keyframe)
+        stats.games += 1
+        pendingTurns: deque[tuple[str, int]] = deque()
+        lastTick = None
+        while True:
+            message = await reader.readexactly(server.TICK.size)
+            now = time.perf_counter_ns()
+            _, _, headX, headY, flags = server.TICK.unpack(message)
+            stats.ticks += 1
+            stats.bytes += len(message)
+            if lastTick is not None:
+                stats.jitter.add(abs(now - lastTick - int(tickInterval * 1e9)))
+            lastTick = now
+            grownTail = None
+            if flags & server.ATE:
+                growth = await reader.readexactly(server.GROWTH.size)
+                tailX, tailY, game.score, preyLeft, preyTop = server.GROWTH.unpack(growth)
+                grownTail = (tailX, tailY)
+                game.preyCoordinates = (preyLeft, preyTop, preyLeft + preyIconWidth, preyTop + preyIconWidth)
+                stats.bytes += len(growth)
+            direction = game.applyTick((headX, headY), grownTail)
+            # the server applies turns in order, one per tick; give up on a turn after a few ticks
+            while pendingTurns and now - pendingTurns[0][1] > 4 * tickInterval * 1e9:
+                pendingTurns.popleft()
+            if pendingTurns and pendingTurns[0][0] == direction:
+                stats.turnLatency.add(now - pendingTurns.popleft()[1])
+            if flags & server.GAME_OVER:
+                code, = server.OVER.unpack(await reader.readexactly(server.OVER.size))
+                stats.endings[server.CAUSES_OF_DEATH[code]] += 1
+                return
+            if rng.random() < decisionRate:
+                turn = greedyBot(game)
+                if turn != game.direction:
+                    writer.write(bytes((DIRECTION_CODES[turn],)))
+                    pendingTurns.append((turn, time.perf_counter_ns()))
+    except (ConnectionError, asyncio.IncompleteReadError):
+        stats.errors += 1
+    finally:
+        writer.close()
+
+
+async def simulateClient(host: str, port: int, stats: LoadStats, deadline: float, decisionRate: float,
+                         rng: random.Random) -> None:
+    """
+        This function plays games one after the other until deadline
+        (loop time).
+    """
+    loop = asyncio.get_running_loop()
+    while loop.time() < deadline:
+        try:
+            await asyncio.wait_for(playGame(host, port, stats, decisionRate, rng), deadline - loop.time())
+        except asyncio.TimeoutError:
+            return
+        except OSError:
+            stats.errors += 1
+            await asyncio.sleep(0.1)
+
+
+async def runLoadTest(host: str, port: int, clients: int, duration: float, rampUp: float,
+                      decisionRate: float, seed: int) -> LoadStats:
+    """
+        This function runs clients simulated clients against the server
+        for duration seconds, starting them evenly over rampUp seconds.
+    """
+    loop = asyncio.get_running_loop()
+    stats = LoadStats()
+    deadline = loop.time() + rampUp + duration
+    tasks = []
+    for i in range(clients):
+        tasks.append(asyncio.create_task(simulateClient(host, port, stats, deadline, decisionRate,
+                                                        random.Random(seed + i))))
+        await asyncio.sleep(rampUp / clients)
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def startLocalServer(arguments: list[str]) -> tuple[multiprocessing.Process, int]:
+    """
+        This function starts server.py in a child process on a free
+        port and returns the process and the port once it accepts
+        connections.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = multiprocessing.Process(target=server.main, args=(["--port", str(port)] + arguments,), daemon=True)
+    process.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("the local server did not start")
+
+
+def printReport(stats: LoadStats, seconds: float) -> None:
+    """
+        This function prints the results of a load test.
+    """
+    jitter, latency = stats.jitter.summary(), stats.turnLatency.summary()
+    print(f"{'games':>16}: {stats.games} ({stats.refused} refused, {stats.errors} errors)")
+    print(f"{'endings':>16}: {dict(stats.endings)}")
+    print(f"{'ticks/s':>16}: {stats.ticks / seconds:,.0f}")
+    print(f"{'bytes/tick':>16}: {stats.bytes / max(1, stats.ticks):.1f}")
+    print(f"{'tick jitter':>16}: p50 {jitter['p50'] / 1e6:.1f} ms, p99 {jitter['p99'] / 1e6:.1f} ms, "
+          f"max {jitter['max'] / 1e6:.1f} ms")
+    print(f"{'turn latency':>16}: p50 {latency['p50'] / 1e6:.1f} ms, p99 {latency['p99'] / 1e6:.1f} ms "
+          f"({latency['count']} turns)")
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+        This function parses the command line and runs the load test.
+    """
+    parser = argparse.ArgumentParser(description="Load-test the snake game server with simulated clients.")
+    parser.add_argument("--host", default="127.0.0.1", help="address of the server")
+    parser.add_argument("--port", type=int, default=7777, help="port of the server")
+    parser.add_argument("--local", action="store_true", help="start a server in a child process for the test")
+    parser.add_argument("--server-args", default="", help="extra arguments for the --local server, space separated")
+    parser.add_argument("--clients", type=int, default=1000, help="number of concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run after the ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which the clients connect")
+    parser.add_argument("--decision-rate", type=float, default=1.0, help="fraction of ticks a client steers on")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first client; clients use consecutive seeds")
+    args = parser.parse_args(argv)
+
+    server.raiseFileLimit()
+    process = None
+    host, port = args.host, args.port
+    if args.local:
+        process, port = startLocalServer(["--stats-interval", "0"] + args.server_args.split())
+        host = "127.0.0.1"
+    try:
+        start = time.perf_counter()
+        stats = asyncio.run(runLoadTest(host, port, args.clients, args.duration, args.ramp_up,
+                                        args.decision_rate, args.seed))
+        printReport(stats, time.perf_counter() - start)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,20 @@
     game (https://en.wikipedia.org/wiki/Snake_(video_game_genre))
 """
 
+import argparse
 import threading
 import queue        #the thread-safe queue from Python standard library
+from collections import deque
 
 from tkinter import Tk, Canvas, Button, Event
-import random, time
+import random, sys
+
+from autopilot import Autopilot
+from engine import BoardConfig, SnakeEngine
+from input_buffer import InputBuffer
+from instrumentation import InstrumentedQueue, Profiler
+from replay import ReplayPlayer, ReplayRecorder
+from scheduler import CATCH_UP, SKIP, FixedTimestepScheduler
 
 class Gui():
     """
@@ -35,6 +44,12 @@ class Gui():
         #create starting game icons for snake and the prey
         self.snakeIcon = self.canvas.create_line(
             (0, 0), (0, 0), fill=ICON_COLOUR, width=SNAKE_ICON_WIDTH)
+        #in "delta" render mode the snake is drawn as one line item per segment:
+        # segmentItems holds them tail first, segmentCoordinates the snake they draw,
+        # and released items wait hidden in segmentPool to be reused
+        self.segmentItems: deque[int] = deque()
+        self.segmentCoordinates: deque[tuple[int, int]] = deque()
+        self.segmentPool: list[int] = []
         self.preyIcon = self.canvas.create_rectangle(
             0, 0, 0, 0, fill=ICON_COLOUR, outline=ICON_COLOUR)
         #display starting score of 0
@@ -44,6 +59,59 @@ class Gui():
         #binding the arrow keys to be able to control the snake
         for key in ("Left", "Right", "Up", "Down"):
             self.root.bind(f"<Key-{key}>", game.whenAnArrowKeyIsPressed)
+        #binding the number keys to be able to change the difficulty level
+        for key in Game.DIFFICULTY_LEVELS:
+            self.root.bind(f"<Key-{key}>", game.whenADifficultyKeyIsPressed)
+
+    def drawSegment(self, start: tuple[int, int], end: tuple[int, int]) -> int:
+        """
+            This method draws a snake segment from start to end with
+            an item from the pool, creating one only if the pool is empty.
+        """
+        if self.segmentPool:
+            item = self.segmentPool.pop()
+            self.canvas.coords(item, *start, *end)
+            self.canvas.itemconfigure(item, state="normal")
+        else:
+            item = self.canvas.create_line(start, end, fill=ICON_COLOUR,
+                width=SNAKE_ICON_WIDTH, capstyle="round")
+        return item
+
+    def releaseSegment(self, item: int) -> None:
+        """
+            This method hides a segment item and returns it to the pool.
+        """
+        self.canvas.itemconfigure(item, state="hidden")
+        self.segmentPool.append(item)
+
+    def resetSegments(self, snakeCoordinates: tuple[tuple[int, int], ...]) -> None:
+        """
+            This method redraws the whole snake as segments, reusing
+            the items of the previous drawing.
+        """
+        while self.segmentItems:
+            self.releaseSegment(self.segmentItems.pop())
+        self.segmentCoordinates = deque(snakeCoordinates)
+        for start, end in zip(snakeCoordinates, snakeCoordinates[1:]):
+            self.segmentItems.append(self.drawSegment(start, end))
+
+    def applyDelta(self, head: tuple[int, int], droppedTail: tuple[int, int],
+                   grownTail: tuple[int, int] | None) -> None:
+        """
+            This method updates the segments for one snake move: a new
+            head, the dropped tail and, if the snake grew, the new tail.
+            It costs the same no matter how long the snake is: the item
+            of the dropped tail is moved to the new head, so a move that
+            doesn't grow the snake changes a single item.
+        """
+        item = self.segmentItems.popleft()
+        self.canvas.coords(item, *self.segmentCoordinates[-1], *head)
+        self.segmentItems.append(item)
+        self.segmentCoordinates.append(head)
+        self.segmentCoordinates.popleft()   # droppedTail
+        if grownTail is not None:
+            self.segmentItems.appendleft(self.drawSegment(grownTail, self.segmentCoordinates[0]))
+            self.segmentCoordinates.appendleft(grownTail)
 
     def gameOver(self):
         """
@@ -63,6 +131,7 @@ class QueueHandler():
     def __init__(self):
         self.queue = gameQueue
         self.gui = gui
+        self.game = game
         self.queueHandler()
     
     def queueHandler(self):
@@ -70,279 +139,302 @@ class QueueHandler():
             This method handles the queue by constantly retrieving
             tasks from it and accordingly taking the corresponding
             action.
-            A task could be: game_over, move, prey, score.
+            A task could be: game_over, move, delta, prey, score, input.
             Each item in the queue is a dictionary whose key is
             the task type (for example, "move") and its value is
             the corresponding task value.
-            If the queue.empty exception happens, it schedules 
-            to call itself after a short delay.
+            All tasks waiting in the queue are drained first and only
+            the latest value of each task type is drawn, so a gui that
+            fell behind renders one frame instead of every stale move.
+            Deltas can't be coalesced, so all of those since the latest
+            move snapshot are applied in order. Input tasks hold the press
+            time of a turn shown by the frame; its latency is recorded
+            once the frame has been drawn.
+            When the queue is empty, it schedules to call itself again
+            after half a game tick, so every tick is shown promptly
+            without polling faster than the game can produce frames.
         '''
+        latestTasks: dict = {}
+        deltas: list[tuple] = []
+        inputs: list[int] = []
         try:
             while True:
                 task = self.queue.get_nowait()
-                if "game_over" in task:
-                    gui.gameOver()
-                elif "move" in task:
-                    points = [x for point in task["move"] for x in point]
-                    gui.canvas.coords(gui.snakeIcon, *points)
-                elif "prey" in task:
-                    gui.canvas.coords(gui.preyIcon, *task["prey"])
-                elif "score" in task:
-                    gui.canvas.itemconfigure(
-                        gui.score, text=f"Your Score: {task['score']}")
+                if "delta" in task:
+                    deltas.append(task["delta"])
+                elif "input" in task:
+                    inputs.append(task["input"])
+                else:
+                    if "move" in task:
+                        deltas.clear()  # the snapshot already includes them
+                    # every task holds one key, so later tasks replace older ones of the same type
+                    latestTasks.update(task)
                 self.queue.task_done()
         except queue.Empty:
-            gui.root.after(100, self.queueHandler)
-
-
-class Game():
+            pass
+        self.render(latestTasks, deltas)
+        for pressedAt in inputs:
+            self.game.inputs.recordRendered(pressedAt)
+        if "game_over" not in latestTasks:
+            gui.root.after(max(1, int(self.game.scheduler.tickInterval * 1000 / 2)), self.queueHandler)
+
+    def render(self, tasks: dict, deltas: list[tuple]) -> None:
+        '''
+            This method draws one frame from the latest snake, prey
+            and score values and the snake deltas that followed, and
+            the game over button if needed.
+        '''
+        if "move" in tasks:
+            if self.game.renderMode == "delta":
+                gui.resetSegments(tasks["move"])
+            else:
+                points = [x for point in tasks["move"] for x in point]
+                gui.canvas.coords(gui.snakeIcon, *points)
+        for delta in deltas:
+            gui.applyDelta(*delta)
+        if "prey" in tasks:
+            gui.canvas.coords(gui.preyIcon, *tasks["prey"])
+        if "score" in tasks:
+            gui.canvas.itemconfigure(
+                gui.score, text=f"Your Score: {tasks['score']}")
+        if "game_over" in tasks:
+            gui.gameOver()
+
+
+class Game(SnakeEngine):
     '''
         This class implements most of the game functionalities.
+        The game rules live in engine.SnakeEngine; this class
+        connects them to the gui through the game queue.
     '''
-    def __init__(self) -> None:
+    #seconds per snake update for each difficulty level key
+    DIFFICULTY_LEVELS = {"1": 0.2, "2": 0.15, "3": 0.08}
+
+    def __init__(self, config: BoardConfig, gameQueue: queue.Queue,
+                 rng: random.Random | None = None, renderMode: str = "snapshot",
+                 tickPolicy: str = SKIP) -> None:
         """
-           This initializer sets the initial snake coordinate list, movement
+           This initializer sets the queue the game tasks are put in
+           and then the initial snake coordinate list, movement
            direction, and arranges for the first prey to be created.
+           With renderMode "snapshot" every move task holds the whole
+           snake; with "delta" only the first does and every later
+           tick sends a delta task with the head, dropped tail and
+           grown tail (or None). tickPolicy says what the scheduler
+           does with the ticks missed after an overrun (SKIP or CATCH_UP).
         """
+        if renderMode not in ("snapshot", "delta"):
+            raise ValueError(f"unknown render mode: {renderMode!r}")
         self.queue = gameQueue
-        self.score = 0
-        #starting length and location of the snake
-        #note that it is a list of tuples, each being an
-        # (x, y) tuple. Initially its size is 5 tuples.
-        # Last tuple represents snake head    
-        self.snakeCoordinates = [(495, 55), (495-PREY_ICON_WIDTH, 55), (495-2*PREY_ICON_WIDTH, 55), 
-                                 (495-3*PREY_ICON_WIDTH, 55), (495-4*PREY_ICON_WIDTH, 55)] 
-        #initial direction of the snake
-        self.direction = "Left"
-        self.gameNotOver = True
-        self.createNewPrey()
+        self.renderMode = renderMode
+        self.needsSnapshot = True   #the next move task must hold the whole snake
+        #turns pressed by the player, applied one per tick
+        self.inputs = InputBuffer()
+        #press time of the last applied turn, until a frame showing its move is queued
+        self.unrenderedInput: int | None = None
+        #replay recorders and players and the autopilot, called before and after every tick
+        self.tickHooks: list[ReplayRecorder | ReplayPlayer | Autopilot] = []
+        #calls tick() every 0.15 sec (speed of snake updates) on a monotonic clock
+        self.scheduler = FixedTimestepScheduler(self.DIFFICULTY_LEVELS["2"], tickPolicy)
+        super().__init__(config, rng)
+
+    def publish(self, task: dict) -> None:
+        """
+            This method puts a game task in the queue for the
+            queue handler to display.
+        """
+        if "game_over" in task:
+            self.queue.put(task) # block until complete, as game no longer needs to continue functioning
+        else:
+            self.queue.put_nowait(task) # don't block as prey and score updates are not essential to game continuation
     
     def superloop(self) -> None: 
         """
             This method implements a main loop
             of the game. It constantly generates "move" 
             tasks to cause the constant movement of the snake.
-            Use the SPEED constant to set how often the move tasks
-            are generated.
+            The scheduler sets how often the move tasks are
+            generated; its stats() report tick jitter and overruns.
         """
-        SPEED = 0.15     #speed of snake updates (sec)
-        while self.gameNotOver:
-            # generate a move task and put in queue
-            self.queue.put({"move": self.snakeCoordinates}) # block until complete as essential to game continuation
-            # move snake
-            self.move()
-            # set how often move tasks generated (speed of snake movement)
-            time.sleep(SPEED)
-            
-    def whenAnArrowKeyIsPressed(self, e: Event) -> None:
-        """ 
-            This method is bound to the arrow keys
-            and is called when one of those is clicked.
-            It sets the movement direction based on 
-            the key that was pressed by the gamer.
-            Use as is.
+        self.scheduler.run(self.tick)
+
+    def tick(self) -> bool:
         """
-        currentDirection = self.direction
-        #ignore invalid keys
-        if (currentDirection == "Left" and e.keysym == "Right" or 
-            currentDirection == "Right" and e.keysym == "Left" or
-            currentDirection == "Up" and e.keysym == "Down" or
-            currentDirection == "Down" and e.keysym == "Up"):
-            return
-        self.direction = e.keysym
-
-    def move(self) -> None:
-        """ 
-            This method implements what is needed to be done
-            for the movement of the snake.
-            It generates a new snake coordinate. 
-            If based on this new movement, the prey has been 
-            captured, it adds a task to the queue for the updated
-            score and also creates a new prey.
-            It also calls a corresponding method to check if 
-            the game should be over. 
-            The snake coordinates list (representing its length 
-            and position) should be correctly updated.
+            This method generates one move task and moves the snake,
+            after turning it by the next buffered turn, if any (tick
+            hooks such as a replay player may still override it).
+            It returns whether the game should continue.
         """
-        newSnakeCoordinates = self.calculateNewCoordinates() 
-
-        # update sefl.SnakeCoordinates list with new coordinates by:
-        # adding new coordinate at head, removing coordinate at tail - equivalent to shifting snake in specified direction
-        self.snakeCoordinates.append(newSnakeCoordinates) # add new snake head coordinate
-        self.snakeCoordinates.pop(0) # remove tail
-
-        preyEaten: bool = False # track if prey is eaten
-
-        # first check if the snake head has "eaten" or touched the prey icon
-        xDistPreySnake: int = newSnakeCoordinates[0] - self.preyCoordinates[0] # x distance between left side of prey icon and snake head 
-        yDistPreySnake: int = newSnakeCoordinates[1] - self.preyCoordinates[1] # y distance between top side of prey icon and snake head 
-
-        if self.direction == "Up" or self.direction == "Down": # if snake moving vertically
-            # whenever snake head begins to touch prey icon/is touching prey icon on vertical axis, counts as prey touching vertically
-            if yDistPreySnake <= PREY_ICON_WIDTH and yDistPreySnake >= 0:  
-                # on horizontal axis, allow extra tolerance distance and still count as prey touching
-                if xDistPreySnake <= PREY_ICON_WIDTH+abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH) and xDistPreySnake >= -abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH):
-                    preyEaten = True  
-        else: # if snake is moving horizontally
-            # whenever snake head begins to touch prey icon/is touching prey icon on horizontal axis, counts as prey touching horizontally
-            if xDistPreySnake <= PREY_ICON_WIDTH and xDistPreySnake >= 0: 
-                # on vertical axis, allow extra tolerance distance and still  count as prey touching
-                if yDistPreySnake <= PREY_ICON_WIDTH+abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH) and yDistPreySnake >= -abs(SNAKE_ICON_WIDTH-PREY_ICON_WIDTH):
-                    preyEaten = True  
-            
-        # if prey is eaten, increase score and length of snake
-        if preyEaten:
-            self.score += 1 # 1 prey eaten means1 point increase in score 
-            self.queue.put_nowait({"score": self.score}) # add to queue to display the new score, don't block as score update not essential to game continuation 
-
-            # increase the length of the snake
-            addLength: tuple = () # coordinate added to increase length of snake 
-
-            # determine the position of this new coordinate to add
-            if self.snakeCoordinates[0][0] == self.snakeCoordinates[1][0]: # check if first 2 snake coordinates are on the same line vertically
-                                                                            # first coordinate = snake tail 
-                # if so, check if snake tail points down or up, adding new length at pointing open end
-                if self.snakeCoordinates[0][1] > self.snakeCoordinates[1][1]: 
-                    # if open tail end points up (snake tail y coordinate greater than y coordinate of tuple next to snake tail)
-                    addLength = (self.snakeCoordinates[0][0], self.snakeCoordinates[0][1] + PREY_ICON_WIDTH)
-                else: # otherwise tail end points down, add length below
-                    addLength = (self.snakeCoordinates[0][0], self.snakeCoordinates[0][1] - PREY_ICON_WIDTH)
-            else: # otherwise first 2 snake coordinates are on the same line horizontally
-                 # check if snake tail points right or left, adding new length at pointing open end
-                if self.snakeCoordinates[0][0] > self.snakeCoordinates[1][0]:
-                    # if open tail end points right (snake tail x-coordinate greater than x-coordinate of tuple next to snake tail)
-                    addLength = (self.snakeCoordinates[0][0] + PREY_ICON_WIDTH, self.snakeCoordinates[0][1])
-                else: # otherwise tail end points left, add length left 
-                    addLength = (self.snakeCoordinates[0][0] - PREY_ICON_WIDTH, self.snakeCoordinates[0][1])
-
-            self.snakeCoordinates.insert(0, addLength) # add the new length the snake gained from eating prey to tail-end
-            self.createNewPrey() # generate a new prey
-
-        # check if game is over, passing coordinates of snake head
-        self.isGameOver(newSnakeCoordinates)
-
-    def calculateNewCoordinates(self) -> tuple[int, int]:
+        turn = self.inputs.next(self.direction)
+        if turn is not None:
+            self.direction, pressedAt = turn
+        for hook in self.tickHooks:
+            hook.beforeTick(self)
+        if not self.gameNotOver: # a replay has ended
+            return False
+        oldTail = self.snakeCoordinates[0]
+        oldLength = len(self.snakeCoordinates)
+        if self.renderMode == "snapshot" or self.needsSnapshot:
+            # generate a move task and put in queue
+            # the task holds an immutable snapshot of the snake, so the gui never sees the deque while it is mutated
+            self.queue.put({"move": tuple(self.snakeCoordinates)}) # block until complete as essential to game continuation
+            self.needsSnapshot = False
+            self.queueInput()   # the snapshot shows the move of the previous tick
+        # move snake
+        self.step()
+        if turn is not None and self.direction == turn[0]:   # not overridden by a hook
+            self.inputs.recordApplied(pressedAt)
+            self.unrenderedInput = pressedAt
+        for hook in self.tickHooks:
+            hook.afterTick(self)
+        if self.renderMode == "delta" and self.gameNotOver:
+            # as with move tasks, the move that ended the game is not drawn
+            grownTail = self.snakeCoordinates[0] if len(self.snakeCoordinates) > oldLength else None
+            self.queue.put({"delta": (self.snakeCoordinates[-1], oldTail, grownTail)})
+            self.queueInput()
+        return self.gameNotOver
+
+    def queueInput(self) -> None:
         """
-            This method calculates and returns the new 
-            coordinates to be added to the snake
-            coordinates list based on the movement
-            direction and the current coordinate of 
-            head of the snake.
-            It is used by the move() method.    
+            This method tells the queue handler the press time of the
+            turn applied by the move the frame queued last shows.
         """
-        lastX, lastY = self.snakeCoordinates[-1] # represents snake head 
-        newX: int = lastX # represents new x coordinate to be added 
-        newY: int = lastY # represents new y coordinate to be added 
-
-        if self.direction == "Right":
-            newX += PREY_ICON_WIDTH # move to the right 
-        elif self.direction == "Left":
-            newX -= PREY_ICON_WIDTH # move to the left 
-        elif self.direction == "Up":
-            newY -= PREY_ICON_WIDTH # move up
-        elif self.direction == "Down":
-            newY += PREY_ICON_WIDTH # move down 
-
-        return (newX, newY)
-
-    def isGameOver(self, snakeCoordinates: tuple[int, int]) -> None:
+        if self.unrenderedInput is not None:
+            self.queue.put_nowait({"input": self.unrenderedInput})
+            self.unrenderedInput = None
+
+    def whenADifficultyKeyIsPressed(self, e: Event) -> None:
         """
-            This method checks if the game is over by 
-            checking if now the snake has passed any wall
-            or if it has bit itself.
-            If that is the case, it updates the gameNotOver 
-            field and also adds a "game_over" task to the queue. 
+            This method is bound to the difficulty level keys and
+            changes the speed of the snake from the next move on.
         """
-        x, y = snakeCoordinates # coordinates of snake head
+        self.scheduler.setTickInterval(self.DIFFICULTY_LEVELS[e.keysym])
 
-        # check if snake hit any of left or right walls or top or bottom walls 
-        # use >= <= to account for latency, so as long as the snake head touches any point outside game window = game over
-        if x >= WINDOW_WIDTH or x <= 0 or y >= WINDOW_HEIGHT or y <= 0:
-            self.gameNotOver = False
-        # if the snake head coordinate is equal to any other snake coordinate, then snake bit itself 
-        else:
-            # check if snake head matches any tuples in snakeCoordinates
-            for coordinate in self.snakeCoordinates[:-1]: # but don't check that head is equal to itself
-                if (x, y) == coordinate:
-                    self.gameNotOver = False
-        
-        if not self.gameNotOver:
-            self.queue.put({"game_over": self.gameNotOver}) # block until complete, as game no longer needs to continue functioning
-
-    def createNewPrey(self) -> None:
+    def whenAnArrowKeyIsPressed(self, e: Event) -> None:
         """ 
-            This methods picks an x and a y randomly as the coordinate 
-            of the new prey and uses that to calculate the 
-            coordinates (x - 5, y - 5, x + 5, y + 5). [you need to replace 5 with a constant]
-            It then adds a "prey" task to the queue with the calculated
-            rectangle coordinates as its value. This is used by the 
-            queue handler to represent the new prey.                    
-            To make playing the game easier, set the x and y to be THRESHOLD
-            away from the walls.
-            In addiction, the prey should not be generated on the score text and on the snake.
+            This method is bound to the arrow keys
+            and is called when one of those is clicked.
+            It queues a turn in the direction of the key
+            that was pressed by the gamer, timestamped now.
+            The game loop applies the queued turns one per
+            tick and ignores those that would reverse the
+            snake, so presses faster than the ticks are kept
+            in order rather than overwriting each other.
         """
-        THRESHOLD = 15   #sets how close prey can be to borders
-
-        # Create list of tuples for possible prey x and y coordinates
-        possiblePreyCoordinates: list = [()]
-
-        # Accounting for border threshold and score text
-        scoreWidth: int = 55  # approximated + buffer
-        scoreHeight: int = 15 # approximated + buffer
-        # We should avoid generating prey on score text (0, 0) to (60 + scoreWidth, 15 + scoreHeight) (as config)
-        scoreBottomRightCoordinate: tuple = (60 + scoreWidth, 15 + scoreHeight)
-
-        # Create set of snake coordinates with width of snake icon
-        # Account for the width of the snake icon and prey icon (such that no overlap should occur)
-        snakeCoordinatesWithWidth: set[tuple[int, int]] = set()
-        for x, y in self.snakeCoordinates:
-            snakeCoordinatesWithWidth.add((x, y))
-            buffer = (SNAKE_ICON_WIDTH - PREY_ICON_WIDTH) // 2
-            for i in range(-buffer, buffer + 1):
-                snakeCoordinatesWithWidth.add((x, y + i))
-                snakeCoordinatesWithWidth.add((x + i, y))
-
-        for xCoordinate in range(THRESHOLD, WINDOW_WIDTH-THRESHOLD): # account for threshold in x and y
-            for yCoordinate in range(THRESHOLD, WINDOW_HEIGHT-THRESHOLD):
-                # avoid generating on score
-                if (xCoordinate, yCoordinate) < scoreBottomRightCoordinate:
-                    continue
-                # prey should also not be generated on the current coordinates of snake itself
-                if (xCoordinate, yCoordinate) in snakeCoordinatesWithWidth:
-                    continue
-                # the remaining coordinates are possible prey coordinates
-                possiblePreyCoordinates.append((xCoordinate, yCoordinate))
-
-        # generate x, y integer coordinates of prey randomly and make sure they account for border threshold
-        xyCoordinates: list = (random.sample(possiblePreyCoordinates, 1))
-        # generate rectangular prey coordinates using the formula specified in documentation 
-        self.preyCoordinates: tuple = (xyCoordinates[0][0] - PREY_ICON_WIDTH / 2, xyCoordinates[0][1] - PREY_ICON_WIDTH / 2,
-                                xyCoordinates[0][0] + PREY_ICON_WIDTH / 2, xyCoordinates[0][1] + PREY_ICON_WIDTH / 2)
-        
-        # put coordinates of new prey in queue
-        self.queue.put_nowait({"prey": self.preyCoordinates})
+        self.inputs.push(e.keysym)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play the snake game.")
+    parser.add_argument("--record", metavar="PATH", help="save a replay of the game to PATH")
+    parser.add_argument("--replay", metavar="PATH", help="play back the replay saved in PATH")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="playback speed, 2 is twice as fast")
+    parser.add_argument("--replay-from", type=int, default=0, metavar="TICK", help="start playback at TICK")
+    parser.add_argument("--tick-policy", choices=(SKIP, CATCH_UP), default=SKIP,
+                        help="drop the ticks missed after a slow tick, or run them back to back")
+    parser.add_argument("--autopilot", action="store_true", help="let the autopilot steer the snake")
+    parser.add_argument("--autopilot-budget", type=float, default=0.002, metavar="SEC",
+                        help="time the autopilot may take per move")
+    parser.add_argument("--instrument", action="store_true",
+                        help="time the hot paths and the queue, report at the end or on SIGUSR1")
+    parser.add_argument("--profile", action="store_true", help="run the session under cProfile")
+    parser.add_argument("--report", metavar="PATH", help="write the report to PATH (JSON if it ends in .json)")
+    args = parser.parse_args()
+    player = ReplayPlayer(args.replay) if args.replay else None
+
     #some constants for our GUI
     WINDOW_WIDTH = 500           
     WINDOW_HEIGHT = 300 
     SNAKE_ICON_WIDTH = 15
     PREY_ICON_WIDTH = 10  
+    if player is not None: # replays are played on the board they were recorded on
+        WINDOW_WIDTH, WINDOW_HEIGHT = player.config.windowWidth, player.config.windowHeight
+        SNAKE_ICON_WIDTH, PREY_ICON_WIDTH = player.config.snakeIconWidth, player.config.preyIconWidth
 
     BACKGROUND_COLOUR = "green"   #you may change this colour if you wish
     ICON_COLOUR = "yellow"        #you may change this colour if you wish
+    RENDER_MODE = "delta"         #"delta" draws only what changed each move, "snapshot" redraws the snake
 
-    gameQueue = queue.Queue()     #instantiate a queue object using python's queue class
+    #collects timings when instrumenting or profiling, otherwise nothing is measured
+    profiler = Profiler() if args.instrument or args.profile else None
 
-    game = Game()        #instantiate the game object
+    gameQueue = queue.Queue()     #instantiate a queue object using python's queue class
+    if args.instrument:
+        gameQueue = InstrumentedQueue(profiler)     #same queue, also tracking depth and task latency
+
+    #board and icon sizes for the game rules
+    config = player.config if player is not None else \
+        BoardConfig(WINDOW_WIDTH, WINDOW_HEIGHT, SNAKE_ICON_WIDTH, PREY_ICON_WIDTH)
+    #seed of the game's random numbers, so it can be recorded and replayed
+    seed = player.seed if player is not None else random.randrange(2**63)
+
+    game = Game(config, gameQueue, random.Random(seed), RENDER_MODE, args.tick_policy)    #instantiate the game object
+    recorder = None
+    if player is not None:
+        player.seek(args.replay_from, game)
+        game.publish({"prey": game.preyCoordinates})
+        game.publish({"score": game.score})
+        game.scheduler.setTickInterval(game.scheduler.tickInterval / args.replay_speed)
+        game.tickHooks.append(player)
+    elif args.record:
+        recorder = ReplayRecorder(game, seed)
+        game.tickHooks.append(recorder)
+    autopilot = None
+    if args.autopilot and player is None:
+        #decision latencies go in the profiler's report when there is one
+        autopilot = Autopilot(config, args.autopilot_budget,
+                              profiler.histogram("Autopilot.decide") if profiler is not None else None)
+        game.tickHooks.append(autopilot)
+
+    if profiler is not None:
+        profiler.addStats("scheduler", game.scheduler.stats)     #tick jitter and overruns go in the report
 
     gui = Gui()    #instantiate the game user interface
     
-    QueueHandler()  #instantiate the queue handler    
+    queueHandler = QueueHandler()  #instantiate the queue handler    
+
+    if args.instrument:
+        #input latencies go in the profiler's report
+        game.inputs = InputBuffer(applied=profiler.histogram("input.applied"),
+                                  rendered=profiler.histogram("input.rendered"))
+        profiler.instrument(game, ("move", "createNewPrey", "isGameOver"))
+        profiler.instrument(queueHandler, ("queueHandler",),
+                            after=lambda: profiler.recordRenderLatency(gameQueue))
+        profiler.dumpOnSignal(path=args.report)
     
     #start a thread with the main loop of the game
-    threading.Thread(target = game.superloop, daemon=True).start()
+    if args.profile:
+        profiler.startProfiling()   #one session profile, covering the game thread too
+    gameThread = threading.Thread(target = game.superloop, daemon=True)
+    gameThread.start()
 
     #start the GUI's own event loop
-    gui.root.mainloop()
\ No newline at end of file
+    gui.root.mainloop()
+
+    #let the tick in progress finish, so the replay and the reports see a whole tick
+    game.scheduler.stop()
+    gameThread.join()
+    if args.profile:
+        profiler.stopProfiling()
+    if recorder is not None:
+        recorder.save(args.record)
+    if profiler is not None:
+        profiler.dump(args.report)
+    else:
+        report = game.scheduler.stats()
+        print(f"ticks: {report['ticks']} ({report['policy']}), {report['overruns']} overran, "
+              f"{report['skippedTicks']} skipped, jitter p50 {report.get('p50Jitter', 0) * 1e3:.2f} ms "
+              f"p99 {report.get('p99Jitter', 0) * 1e3:.2f} ms max {report['maxJitter'] * 1e3:.2f} ms",
+              file=sys.stderr)
+        if autopilot is not None:
+            report = autopilot.report()
+            latency = report.pop("latency")
+            print(f"autopilot: {report}, decision p50 {latency['p50'] / 1000:.0f} us, "
+                  f"p99 {latency['p99'] / 1000:.0f} us, max {latency['max'] / 1000:.0f} us", file=sys.stderr)
+        if game.inputs.pushed:
+            report = game.inputs.report()
+            applied, rendered = report["applied"], report["rendered"]
+            print(f"input: {report['pushed']} turns ({report['dropped']} dropped, {report['rejected']} ignored), "
+                  f"press to move p50 {applied['p50'] / 1e6:.1f} ms p99 {applied['p99'] / 1e6:.1f} ms, "
+                  f"press to frame p50 {rendered['p50'] / 1e6:.1f} ms p99 {rendered['p99'] / 1e6:.1f} ms",
+                  file=sys.stderr)
\ No newline at end of file
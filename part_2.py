@@ -1,9 +1,27 @@
 # Group #:          33
 # Student names:    Rachael Peng, Michael Koon
 
+import argparse
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import pickle
+import statistics
+import struct
 import threading
 import queue
 import time, random
+from array import array
+from collections.abc import Awaitable, Callable
+from multiprocessing import shared_memory
+
+# Put in the pipeline queue once per consumer after the last batch, telling it to stop
+SENTINEL = None
+# Seconds between two checks that no pipeline process has crashed while waiting on it
+POLL_INTERVAL = 0.1
+
+logger = logging.getLogger(__name__)
 
 def consumerWorker(queue: queue.Queue) -> None:
     """
@@ -13,6 +31,8 @@ def consumerWorker(queue: queue.Queue) -> None:
     For each item, it prints a message indicating which thread consumed the item,
     calls `queue.task_done()` to signal that the item has been processed,
     and then sleeps for a random amount of time to simulate work.
+    It returns when it gets the `SENTINEL`, which the demo never puts, so other callers
+    can join their consumers.
 
     Args:
         queue (queue.Queue): The shared queue from which to consume items.
@@ -20,6 +40,9 @@ def consumerWorker(queue: queue.Queue) -> None:
     # Just do while True as this is a daemon thread (infinite loop)
     while True:
         item = queue.get()  # Get the item from the queue
+        if item is SENTINEL:
+            queue.task_done()
+            return
         print(f"{threading.current_thread().name} consumed item {item}")
         # Decrement the unfinished task counter in the queue, necessary for `queue.join()`
         queue.task_done()
@@ -53,48 +76,521 @@ def producerWorker(queue: queue.Queue) -> None:
         time.sleep(random.random())  # Introduce some randomness
 
 
-if __name__ == "__main__":
-    buffer: queue.Queue[int] = queue.Queue() # We will put randint into the queue
+def noWork(item: int) -> None:
+    """
+    A work function that does nothing, so the pipeline itself is measured.
+    """
 
-    # Use threading module types to create 4 producer threads and 5 consumer threads.
-    num_producers = 4
-    num_consumers = 5
 
-    # Each producer will put 5 items in total, i.e. total 5 * 4 = 20 items
-    items_per_producer = 5
+def sleepWork(item: int) -> None:
+    """
+    A work function sleeping a random time, like the consumers of the demo.
+    """
+    time.sleep(random.random())
 
-    # Random number range
-    item_range = (1, 100)
 
-    # Create, name & start producer threads
-    # An array is created to store the producer workers as they are non-daemon and we would need to `.join()` for them
-    producers: list[threading.Thread] = []
-    for i in range(num_producers):
-        t = threading.Thread(target=producerWorker, args=(buffer,), name=f"Producer-{i}")
-        t.start()
-        producers.append(t)
+def cpuWork(item: int) -> None:
+    """
+    A CPU-bound work function whose cost grows with the item.
+    """
+    sum(i * i for i in range(item * 100))
+
+
+async def asyncSleepWork(item: int) -> None:
+    """
+    A work function for the asyncio backend, waiting a random time without blocking the event loop.
+    """
+    await asyncio.sleep(random.random())
+
+
+WORK_FUNCTIONS: dict[str, Callable[[int], None]] = {"none": noWork, "sleep": sleepWork, "cpu": cpuWork}
+# The asyncio backend must not block its event loop, so its "sleep" work awaits instead
+ASYNC_WORK_FUNCTIONS: dict[str, Callable[[int], Awaitable[None] | None]] = {**WORK_FUNCTIONS, "sleep": asyncSleepWork}
+
+
+def batchedProducerWorker(buffer: queue.Queue, itemCount: int, itemRange: tuple[int, int], batchSize: int,
+                          errors: list[BaseException], stop: threading.Event) -> None:
+    """
+    The target function for a pipeline producer thread.
+
+    It puts `itemCount` random items into the bounded `buffer` in batches of up to
+    `batchSize` items, so the queue's lock is taken once per batch instead of once per item.
+    Every batch is a `(created, items)` tuple, where `created` is the `time.perf_counter()`
+    time the batch was finished, used by the consumers to measure latency.
+    `buffer.put()` blocks while the queue is full, which slows producers down to the
+    pace of the consumers (backpressure).
+    If producing fails, the error is kept in `errors` and `stop` is set, like in the consumers.
+
+    Args:
+        buffer (queue.Queue): The bounded queue into which to put batches.
+        itemCount (int): The number of items to produce.
+        itemRange (tuple[int, int]): The range of the random items, inclusive.
+        batchSize (int): The number of items per batch.
+        errors (list[BaseException]): The list to which to append the error if producing fails.
+        stop (threading.Event): Set when a producer or a consumer failed, to stop producing early.
+    """
+    rng = random.Random()  # A generator per thread avoids contention on the shared one
+    low, high = itemRange
+    try:
+        for start in range(0, itemCount, batchSize):
+            if stop.is_set():
+                return
+            items = [rng.randint(low, high) for _ in range(min(batchSize, itemCount - start))]
+            buffer.put((time.perf_counter(), items))
+    except Exception as error:
+        errors.append(error)
+        stop.set()
+
+
+def batchedConsumerWorker(buffer: queue.Queue, work: Callable[[int], None], batches: list[tuple[float, int]],
+                          logEvery: int, errors: list[BaseException], stop: threading.Event) -> None:
+    """
+    The target function for a pipeline consumer thread.
 
-    # Create, name & start consumer threads
-    # Consumers are daemon threads as they will run indefinitely until the buffer is empty 
-    # Therefore, we don't need to `.join()` for them and thus no need to store them in an array
-    for i in range(num_consumers):
-        threading.Thread(target=consumerWorker, args=(buffer,), daemon=True, name=f"Consumer-{i}").start()
+    It takes batches from `buffer` and calls `work` on each item until it gets the
+    `SENTINEL`, then returns, so consumers can be joined instead of being daemon threads.
+    Only every `logEvery`-th batch is logged (0 logs none), instead of printing every item.
+    If `work` raises, the error is kept in `errors` and `stop` is set; from then on the
+    consumers only drain the queue, so the producers never block on a full queue.
 
-    # Wait for all producer threads to finishs
+    Args:
+        buffer (queue.Queue): The queue from which to take batches.
+        work (Callable[[int], None]): The function doing the work for one item.
+        batches (list[tuple[float, int]]): The list to which to append the latency of every
+            batch, from its creation to the end of its processing (seconds), and its size.
+        logEvery (int): The sampling period of the log messages, in batches.
+        errors (list[BaseException]): The list to which to append the error of a failed `work`.
+        stop (threading.Event): Set when a `work` fails, telling everyone to stop working.
+    """
+    name = threading.current_thread().name
+    while True:
+        batch = buffer.get()
+        if batch is SENTINEL:
+            buffer.task_done()
+            return
+        if not stop.is_set():
+            created, items = batch
+            try:
+                for item in items:
+                    work(item)
+            except Exception as error:
+                errors.append(error)
+                stop.set()
+            else:
+                recordBatch(batches, created, name, len(items), logEvery)
+        buffer.task_done()
+
+
+def recordBatch(batches: list[tuple[float, int]], created: float, name: str, size: int, logEvery: int) -> None:
+    """
+    Records the latency and size of a consumed batch and logs every `logEvery`-th batch of a consumer.
+    `time.perf_counter()` is system-wide, so this works across processes too.
+    """
+    batches.append((time.perf_counter() - created, size))
+    if logEvery and len(batches) % logEvery == 0:
+        logger.info("%s consumed %d batches, last of %d items", name, len(batches), size)
+
+
+def runThreadPipeline(numProducers: int, numConsumers: int, itemsPerProducer: int, itemRange: tuple[int, int],
+                      batchSize: int, queueSize: int, work: Callable[[int], None],
+                      logEvery: int) -> list[tuple[float, int]]:
+    """
+    Runs the pipeline with producer and consumer threads sharing a bounded `queue.Queue`.
+
+    Producers fill a queue bounded to `queueSize` batches; once they have all finished,
+    one `SENTINEL` per consumer is put so that every consumer stops after the last batch.
+    If a producer or `work` raises, the pipeline winds down and the first error is raised
+    again here.
+
+    Returns:
+        list[tuple[float, int]]: The latency (seconds) and size of every batch consumed.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=queueSize)
+    batches: list[list[tuple[float, int]]] = [[] for _ in range(numConsumers)]  # One list per consumer, no locking needed
+    errors: list[BaseException] = []
+    stop = threading.Event()
+    producers = [threading.Thread(target=batchedProducerWorker,
+                                  args=(buffer, itemsPerProducer, itemRange, batchSize, errors, stop),
+                                  name=f"Producer-{i}") for i in range(numProducers)]
+    consumers = [threading.Thread(target=batchedConsumerWorker,
+                                  args=(buffer, work, batches[i], logEvery, errors, stop),
+                                  name=f"Consumer-{i}") for i in range(numConsumers)]
+    for t in producers + consumers:
+        t.start()
     for p in producers:
         p.join()
+    for _ in consumers:
+        buffer.put(SENTINEL)
+    for c in consumers:
+        c.join()
+    if errors:
+        raise errors[0]
+    return [batch for consumerBatches in batches for batch in consumerBatches]
+
+
+class SharedRingBuffer:
+    """
+    A bounded queue of integer batches in shared memory, for producer and consumer processes.
+
+    Each of the `slots` slots holds a batch as its item count, its creation time and up to
+    `batchSize` items, so batches cross process boundaries without being pickled.
+    A lock guards the head and tail indices, and two semaphores count the empty and the
+    filled slots, so `put()` blocks while the buffer is full and `get()` while it is empty.
+    A count of -1 is the sentinel.
+    """
+    HEADER = struct.Struct("qq")  # Head (next slot to fill) and tail (next slot to take) indices
+    SLOT_HEADER = struct.Struct("qd")  # Item count and creation time of a batch
+
+    def __init__(self, slots: int, batchSize: int) -> None:
+        self.slots = slots
+        self.batchSize = batchSize
+        self.slotSize = self.SLOT_HEADER.size + 8 * batchSize
+        self.memory = shared_memory.SharedMemory(create=True, size=self.HEADER.size + slots * self.slotSize)
+        self.HEADER.pack_into(self.memory.buf, 0, 0, 0)
+        self.lock = multiprocessing.Lock()
+        self.emptySlots = multiprocessing.Semaphore(slots)
+        self.filledSlots = multiprocessing.Semaphore(0)
+
+    def put(self, created: float, items: list[int]) -> None:
+        """
+        Puts a batch into the buffer, waiting for an empty slot.
+        """
+        self.emptySlots.acquire()
+        with self.lock:
+            head, tail = self.HEADER.unpack_from(self.memory.buf, 0)
+            offset = self.HEADER.size + head * self.slotSize
+            self.SLOT_HEADER.pack_into(self.memory.buf, offset, len(items), created)
+            if items:
+                itemsOffset = offset + self.SLOT_HEADER.size
+                self.memory.buf[itemsOffset:itemsOffset + 8 * len(items)] = array("q", items).tobytes()
+            self.HEADER.pack_into(self.memory.buf, 0, (head + 1) % self.slots, tail)
+        self.filledSlots.release()
+
+    def get(self) -> tuple[float, list[int]] | None:
+        """
+        Takes the oldest batch from the buffer, waiting for one; returns `SENTINEL` for the sentinel.
+        """
+        self.filledSlots.acquire()
+        with self.lock:
+            head, tail = self.HEADER.unpack_from(self.memory.buf, 0)
+            offset = self.HEADER.size + tail * self.slotSize
+            count, created = self.SLOT_HEADER.unpack_from(self.memory.buf, offset)
+            items = array("q")
+            if count > 0:
+                itemsOffset = offset + self.SLOT_HEADER.size
+                items.frombytes(self.memory.buf[itemsOffset:itemsOffset + 8 * count])
+            self.HEADER.pack_into(self.memory.buf, 0, head, (tail + 1) % self.slots)
+        self.emptySlots.release()
+        return SENTINEL if count < 0 else (created, items.tolist())
+
+    def putSentinel(self, timeout: float | None = None) -> bool:
+        """
+        Puts the sentinel, telling one consumer to stop, waiting at most `timeout` seconds
+        for an empty slot. Returns False if there was none in time.
+        """
+        if not self.emptySlots.acquire(timeout=timeout):
+            return False
+        with self.lock:
+            head, tail = self.HEADER.unpack_from(self.memory.buf, 0)
+            self.SLOT_HEADER.pack_into(self.memory.buf, self.HEADER.size + head * self.slotSize, -1, 0.0)
+            self.HEADER.pack_into(self.memory.buf, 0, (head + 1) % self.slots, tail)
+        self.filledSlots.release()
+        return True
+
+    def close(self) -> None:
+        """
+        Releases the shared memory; the process that created the buffer should call it last.
+        """
+        self.memory.close()
+        self.memory.unlink()
+
+
+def ringProducerWorker(buffer: SharedRingBuffer, itemCount: int, itemRange: tuple[int, int], batchSize: int,
+                       stop: multiprocessing.Event) -> None:
+    """
+    The target function for a pipeline producer process, like `batchedProducerWorker`.
+    """
+    rng = random.Random()
+    low, high = itemRange
+    for start in range(0, itemCount, batchSize):
+        if stop.is_set():
+            return
+        buffer.put(time.perf_counter(), [rng.randint(low, high) for _ in range(min(batchSize, itemCount - start))])
+
+
+def ringConsumerWorker(buffer: SharedRingBuffer, work: Callable[[int], None], results: multiprocessing.Queue,
+                       logEvery: int, stop: multiprocessing.Event) -> None:
+    """
+    The target function for a pipeline consumer process, like `batchedConsumerWorker`.
+    It sends the latencies and sizes of its batches back through `results` when it gets
+    the sentinel, or the error of `work` if it failed.
+    """
+    name = multiprocessing.current_process().name
+    batches: list[tuple[float, int]] = []
+    error: BaseException | None = None
+    while (batch := buffer.get()) is not SENTINEL:
+        if stop.is_set():
+            continue
+        created, items = batch
+        try:
+            for item in items:
+                work(item)
+        except Exception as exception:
+            error = exception
+            stop.set()
+        else:
+            recordBatch(batches, created, name, len(items), logEvery)
+    if error is not None:
+        try:
+            pickle.dumps(error)
+        except Exception:
+            error = RuntimeError(f"{name}: {error!r}")  # The error itself can't be sent back
+    results.put(batches if error is None else error)
+
+
+def runProcessPipeline(numProducers: int, numConsumers: int, itemsPerProducer: int, itemRange: tuple[int, int],
+                       batchSize: int, queueSize: int, work: Callable[[int], None],
+                       logEvery: int) -> list[tuple[float, int]]:
+    """
+    Runs the pipeline with producer and consumer processes sharing a `SharedRingBuffer`,
+    so CPU-bound work runs in parallel without the GIL. `work` must be picklable.
+    An error raised by `work` is raised again here, like in `runThreadPipeline`. Every wait
+    on the processes also checks every `POLL_INTERVAL` seconds that none of them crashed,
+    and raises a `RuntimeError` if one did.
+
+    Returns:
+        list[float]: The latency of every batch (seconds).
+    """
+    buffer = SharedRingBuffer(queueSize, batchSize)
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    producers = [multiprocessing.Process(target=ringProducerWorker, name=f"Producer-{i}",
+                                         args=(buffer, itemsPerProducer, itemRange, batchSize, stop))
+                 for i in range(numProducers)]
+    consumers = [multiprocessing.Process(target=ringConsumerWorker, name=f"Consumer-{i}",
+                                         args=(buffer, work, results, logEvery, stop))
+                 for i in range(numConsumers)]
+
+    def checkProcesses() -> None:
+        crashed = [p for p in producers + consumers if p.exitcode]
+        if crashed:
+            raise RuntimeError(f"{crashed[0].name} exited with code {crashed[0].exitcode}")
+
+    try:
+        for p in producers + consumers:
+            p.start()
+        for p in producers:
+            while p.exitcode is None:
+                p.join(POLL_INTERVAL)
+                checkProcesses()
+            checkProcesses()  # It may have crashed before we got to wait for it
+        for _ in consumers:
+            while not buffer.putSentinel(POLL_INTERVAL):
+                checkProcesses()
+        # Collect the results before joining, a process can't exit until its queued data is taken
+        batches: list[tuple[float, int]] = []
+        errors: list[BaseException] = []
+        for _ in consumers:
+            while True:
+                try:
+                    result = results.get(timeout=POLL_INTERVAL)
+                    break
+                except queue.Empty:
+                    checkProcesses()
+            if isinstance(result, BaseException):
+                errors.append(result)
+            else:
+                batches.extend(result)
+        for c in consumers:
+            c.join()
+    finally:
+        # Only left running if something failed
+        for p in producers + consumers:
+            if p.is_alive():
+                p.terminate()
+                p.join()
+        buffer.close()
+    if errors:
+        raise errors[0]
+    return batches
+
+
+async def asyncProducerWorker(buffer: asyncio.Queue, itemCount: int, itemRange: tuple[int, int],
+                              batchSize: int, errors: list[BaseException], stop: asyncio.Event) -> None:
+    """
+    The pipeline producer coroutine, like `batchedProducerWorker`.
+    """
+    rng = random.Random()
+    low, high = itemRange
+    try:
+        for start in range(0, itemCount, batchSize):
+            if stop.is_set():
+                return
+            await buffer.put((time.perf_counter(),
+                              [rng.randint(low, high) for _ in range(min(batchSize, itemCount - start))]))
+    except Exception as error:
+        errors.append(error)
+        stop.set()
+
+
+async def asyncConsumerWorker(buffer: asyncio.Queue, work: Callable[[int], Awaitable[None] | None],
+                              batches: list[tuple[float, int]], logEvery: int, name: str,
+                              errors: list[BaseException], stop: asyncio.Event) -> None:
+    """
+    The pipeline consumer coroutine, like `batchedConsumerWorker`.
+    `work` may be a coroutine function, whose result is awaited, for I/O-bound work.
+    """
+    while (batch := await buffer.get()) is not SENTINEL:
+        if stop.is_set():
+            continue
+        created, items = batch
+        try:
+            for item in items:
+                result = work(item)
+                if inspect.isawaitable(result):
+                    await result
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+        else:
+            recordBatch(batches, created, name, len(items), logEvery)
+
+
+def runAsyncioPipeline(numProducers: int, numConsumers: int, itemsPerProducer: int, itemRange: tuple[int, int],
+                       batchSize: int, queueSize: int, work: Callable[[int], Awaitable[None] | None],
+                       logEvery: int) -> list[tuple[float, int]]:
+    """
+    Runs the pipeline with producer and consumer coroutines sharing a bounded `asyncio.Queue`
+    on one event loop, which suits many consumers waiting on I/O.
+    An error raised by a producer or `work` is raised again here, like in `runThreadPipeline`.
+
+    Returns:
+        list[tuple[float, int]]: The latency (seconds) and size of every batch consumed.
+    """
+    async def pipeline() -> list[tuple[float, int]]:
+        buffer: asyncio.Queue = asyncio.Queue(maxsize=queueSize)
+        batches: list[tuple[float, int]] = []
+        errors: list[BaseException] = []
+        stop = asyncio.Event()
+        consumers = [asyncio.create_task(asyncConsumerWorker(buffer, work, batches, logEvery, f"Consumer-{i}",
+                                                             errors, stop))
+                     for i in range(numConsumers)]
+        await asyncio.gather(*(asyncProducerWorker(buffer, itemsPerProducer, itemRange, batchSize, errors, stop)
+                               for _ in range(numProducers)))
+        for _ in consumers:
+            await buffer.put(SENTINEL)
+        await asyncio.gather(*consumers)
+        if errors:
+            raise errors[0]
+        return batches
+
+    return asyncio.run(pipeline())
+
+
+BACKENDS = {"threads": runThreadPipeline, "processes": runProcessPipeline, "asyncio": runAsyncioPipeline}
+
+
+def runPipeline(numProducers: int, numConsumers: int, itemsPerProducer: int, itemRange: tuple[int, int],
+                batchSize: int = 64, queueSize: int = 64, work: Callable[[int], None] = noWork,
+                logEvery: int = 0, backend: str = "threads") -> dict:
+    """
+    Runs the batched producer/consumer pipeline to completion on one of the `BACKENDS` and reports on it.
+
+    Returns:
+        dict: The number of items consumed, the elapsed seconds, the items per second and the
+            50th, 90th and 99th percentile batch latencies (seconds).
+    """
+    start = time.perf_counter()
+    batches = BACKENDS[backend](numProducers, numConsumers, itemsPerProducer, itemRange,
+                                batchSize, queueSize, work, logEvery)
+    elapsed = time.perf_counter() - start
+
+    items = sum(size for _, size in batches)
+    latencies = sorted(latency for latency, _ in batches)
+    report = {"items": items, "seconds": elapsed, "itemsPerSecond": items / elapsed}
+    if len(latencies) >= 2:
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        report.update(p50Latency=percentiles[49], p90Latency=percentiles[89], p99Latency=percentiles[98])
+    return report
+
+
+def positiveInt(text: str) -> int:
+    """
+    Parses a command line count that must be at least 1.
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Producer/consumer demo and batched pipeline.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="run the batched pipeline and report throughput instead of the demo")
+    parser.add_argument("--backend", choices=BACKENDS, default="threads", help="concurrency model of the pipeline")
+    parser.add_argument("--producers", type=positiveInt, default=4, help="number of producers")
+    parser.add_argument("--consumers", type=positiveInt, default=5, help="number of consumers")
+    parser.add_argument("--items-per-producer", type=int,
+                        help="items each producer puts (default: 5 in the demo, 100000 in the pipeline)")
+    parser.add_argument("--item-range", type=int, nargs=2, default=(1, 100), metavar=("LOW", "HIGH"),
+                        help="range of the random items, inclusive")
+    parser.add_argument("--batch-size", type=positiveInt, default=64, help="items per batch in the pipeline")
+    parser.add_argument("--queue-size", type=positiveInt, default=64, help="batches the pipeline queue holds")
+    parser.add_argument("--work", choices=WORK_FUNCTIONS, default="none", help="work done by consumers per item")
+    parser.add_argument("--log-every", type=int, default=0, help="log every N-th batch of each consumer (0: never)")
+    args = parser.parse_args()
+
+    if args.pipeline:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        work = (ASYNC_WORK_FUNCTIONS if args.backend == "asyncio" else WORK_FUNCTIONS)[args.work]
+        report = runPipeline(args.producers, args.consumers, args.items_per_producer or 100_000,
+                             tuple(args.item_range), args.batch_size, args.queue_size, work, args.log_every,
+                             args.backend)
+        for key, value in report.items():
+            print(f"{key}: {value:,.6g}")
+    else:
+        buffer: queue.Queue[int] = queue.Queue() # We will put randint into the queue
+
+        # Use threading module types to create 4 producer threads and 5 consumer threads (or as set on the command line).
+        num_producers = args.producers
+        num_consumers = args.consumers
+
+        # Each producer will put 5 items in total, i.e. total 5 * 4 = 20 items
+        items_per_producer = args.items_per_producer or 5
+
+        # Random number range
+        item_range = tuple(args.item_range)
+
+        # Create, name & start producer threads
+        # An array is created to store the producer workers as they are non-daemon and we would need to `.join()` for them
+        producers: list[threading.Thread] = []
+        for i in range(num_producers):
+            t = threading.Thread(target=producerWorker, args=(buffer,), name=f"Producer-{i}")
+            t.start()
+            producers.append(t)
+
+        # Create, name & start consumer threads
+        # Consumers are daemon threads as they will run indefinitely until the buffer is empty 
+        # Therefore, we don't need to `.join()` for them and thus no need to store them in an array
+        for i in range(num_consumers):
+            threading.Thread(target=consumerWorker, args=(buffer,), daemon=True, name=f"Consumer-{i}").start()
+
+        # Wait for all producer threads to finishs
+        for p in producers:
+            p.join()
 
-    # Wait for the buffer to be empty, i.e. all consumer threads have finished
-    # After this is done, we can safely exit the program
-    buffer.join()
+        # Wait for the buffer to be empty, i.e. all consumer threads have finished
+        # After this is done, we can safely exit the program
+        buffer.join()
 
-    # Some additional checks
-    print(f"The buffer is empty now: {buffer.empty()}")  # Should be True
+        # Some additional checks
+        print(f"The buffer is empty now: {buffer.empty()}")  # Should be True
 
-    remaining_threads = threading.enumerate()
-    print(f"Remaining threads: {len(remaining_threads)}")  # Should be 1 (MainThread) + 5 (num_consumers) = 6
-    for thread in remaining_threads: # Should be only the MainThread and the `Consumer-{i}` threads
-        print(thread.name)
+        remaining_threads = threading.enumerate()
+        print(f"Remaining threads: {len(remaining_threads)}")  # Should be 1 (MainThread) + num_consumers = 6
+        for thread in remaining_threads: # Should be only the MainThread and the `Consumer-{i}` threads
+            print(thread.name)
 
-    # We can then gracefully exit the program as buffer is empty and consumer threads are daemon
-    print("All threads have finished, exiting program...")
+        # We can then gracefully exit the program as buffer is empty and consumer threads are daemon
+        print("All threads have finished, exiting program...")
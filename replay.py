@@ -0,0 +1,271 @@
+"""
+    This module records snake games to compact binary replay files
+    and plays them back deterministically.
+
+    A replay holds the seed, the direction of every tick packed four to
+    a byte and a keyframe of the game state every keyframeInterval ticks.
+    The game's random number generator is reseeded from the seed at every
+    keyframe, so playback can start at the keyframe before any tick and
+    fast-forward from there instead of from the start of the game.
+
+    File layout (little-endian):
+        header       HEADER struct
+        offsets      keyframeCount u64 file offsets of the keyframes
+        inputs       ceil(tickCount / 4) bytes of 2 bit direction codes
+        keyframes    KEYFRAME struct, then length - 1 2 bit codes giving
+                     the direction from each segment to the next one
+                     towards the tail, starting at the head
+"""
+
+import mmap
+import random
+import struct
+
+from engine import BoardConfig, DIRECTIONS, SnakeEngine
+
+MAGIC = b"SNKR"
+VERSION = 1
+#magic, version, board config, seed, keyframeInterval, tickCount, keyframeCount
+HEADER = struct.Struct("<4sBHHHHHqIII")
+#tick, score, direction code, length, head x, head y, prey left, prey top
+KEYFRAME = struct.Struct("<IIBIiidd")
+OFFSET = struct.Struct("<Q")
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+#unit (x, y) step for each direction code
+STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def keyframeSeed(seed: int, tick: int) -> int:
+    """
+        This function returns the seed the game's random number
+        generator is reset to at the keyframe of the given tick.
+    """
+    return (seed * 1_000_003 + tick) & 0xFFFFFFFFFFFFFFFF
+
+
+def packCodes(codes: list[int]) -> bytes:
+    """
+        This function packs 2 bit codes four to a byte, first code
+        in the lowest bits.
+    """
+    packed = bytearray((len(codes) + 3) // 4)
+    for i, code in enumerate(codes):
+        packed[i >> 2] |= code << ((i & 3) << 1)
+    return bytes(packed)
+
+
+def encodeKeyframe(game: SnakeEngine) -> bytes:
+    """
+        This function encodes the current state of a game as a keyframe.
+        Every segment is next to the one before it, so the body is stored
+        as the head plus one direction code per further segment.
+    """
+    step = game.config.preyIconWidth
+    body = list(reversed(game.snakeCoordinates))  # head first
+    codes = []
+    for (x0, y0), (x1, y1) in zip(body, body[1:]):
+        codes.append(STEPS.index(((x1 - x0) // step, (y1 - y0) // step)))
+    headX, headY = body[0]
+    return KEYFRAME.pack(game.ticks, game.score, DIRECTION_CODES[game.direction], len(body),
+                         headX, headY, game.preyCoordinates[0], game.preyCoordinates[1]) + packCodes(codes)
+
+
+def decodeKeyframe(data: bytes, offset: int, step: int) -> tuple[int, int, str, list[tuple[int, int]], tuple]:
+    """
+        This function decodes the keyframe at offset in data, for a board
+        whose cells are step pixels apart. It returns the tick, score,
+        direction, body (tail first) and prey coordinates.
+    """
+    tick, score, direction, length, x, y, preyX, preyY = KEYFRAME.unpack_from(data, offset)
+    codes = data[offset + KEYFRAME.size:offset + KEYFRAME.size + (length + 2) // 4]
+    body = [(x, y)]
+    for i in range(length - 1):
+        stepX, stepY = STEPS[(codes[i >> 2] >> ((i & 3) << 1)) & 3]
+        x += stepX * step
+        y += stepY * step
+        body.append((x, y))
+    body.reverse()  # tail first, head last
+    return tick, score, DIRECTIONS[direction], body, (preyX, preyY, preyX + step, preyY + step)
+
+
+def keyframeSize(data: bytes, offset: int) -> int:
+    """
+        This function returns the size in bytes of the keyframe at
+        offset in data.
+    """
+    length = KEYFRAME.unpack_from(data, offset)[3]
+    return KEYFRAME.size + (length + 2) // 4
+
+
+def restoreKeyframe(game: SnakeEngine, data: bytes, offset: int) -> None:
+    """
+        This function sets game to the state stored in the keyframe
+        at offset in data.
+    """
+    tick, score, direction, body, prey = decodeKeyframe(data, offset, game.config.preyIconWidth)
+    game.snakeCoordinates = game.createBody(body)
+    game.occupiedCells = game.createOccupancy()
+    for coordinate in body:
+        game.occupyCell(coordinate)
+    game.direction = direction
+    game.score = score
+    game.ticks = tick
+    game.preyCoordinates = prey
+    game.gameNotOver = True
+    game.causeOfDeath = None
+
+
+class ReplayRecorder():
+    """
+        This class records a game as it is played. Call beforeTick and
+        afterTick around every tick of the game, or let step() do it,
+        then save() the replay.
+    """
+    def __init__(self, game: SnakeEngine, seed: int, keyframeInterval: int = 256) -> None:
+        """
+            The initializer starts recording game, which must not have
+            moved yet and must have been created with random.Random(seed).
+        """
+        if game.ticks != 0:
+            raise ValueError("a game can only be recorded from its first tick")
+        self.game = game
+        self.seed = seed
+        self.keyframeInterval = keyframeInterval
+        self.inputs = bytearray()
+        self.keyframes: list[bytes] = []
+
+    def beforeTick(self, game: SnakeEngine) -> None:
+        """
+            This method stores a keyframe and reseeds the random number
+            generator every keyframeInterval ticks.
+        """
+        if game.ticks % self.keyframeInterval == 0:
+            self.keyframes.append(encodeKeyframe(game))
+            game.random.seed(keyframeSeed(self.seed, game.ticks))
+
+    def afterTick(self, game: SnakeEngine) -> None:
+        """
+            This method logs the direction the snake moved in.
+        """
+        tick = game.ticks - 1
+        if tick & 3 == 0:
+            self.inputs.append(0)
+        self.inputs[-1] |= DIRECTION_CODES[game.direction] << ((tick & 3) << 1)
+
+    def step(self, direction: str | None = None) -> bool:
+        """
+            This method advances the recorded game by one tick, like
+            SnakeEngine.step, and records it.
+        """
+        self.beforeTick(self.game)
+        running = self.game.step(direction)
+        self.afterTick(self.game)
+        return running
+
+    def save(self, path: str) -> None:
+        """
+            This method writes the replay recorded so far to path.
+            It should be called once the game has stopped ticking.
+        """
+        config = self.game.config
+        inputs = bytes(self.inputs)
+        keyframes = list(self.keyframes)
+        ticks = min(len(inputs) * 4, self.game.ticks)
+        offset = HEADER.size + OFFSET.size * len(keyframes) + len(inputs)
+        offsets = []
+        for keyframe in keyframes:
+            offsets.append(OFFSET.pack(offset))
+            offset += len(keyframe)
+        with open(path, "wb") as replayFile:
+            replayFile.write(HEADER.pack(MAGIC, VERSION, config.windowWidth, config.windowHeight,
+                                         config.snakeIconWidth, config.preyIconWidth, config.threshold,
+                                         self.seed, self.keyframeInterval, ticks, len(keyframes)))
+            replayFile.write(b"".join(offsets))
+            replayFile.write(inputs)
+            replayFile.write(b"".join(keyframes))
+
+
+class ReplayPlayer():
+    """
+        This class plays back a replay file. The file is memory-mapped,
+        so opening it and seeking only read the bytes they need.
+    """
+    def __init__(self, path: str) -> None:
+        """
+            The initializer maps the replay file and reads its header.
+        """
+        with open(path, "rb") as replayFile:
+            self.data = mmap.mmap(replayFile.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, width, height, snakeIconWidth, preyIconWidth, threshold,
+         self.seed, self.keyframeInterval, self.tickCount, self.keyframeCount) = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} snake replay")
+        if self.keyframeCount == 0:    # even a replay of no tick has the starting keyframe
+            self.data.close()
+            raise ValueError(f"{path} has no keyframes")
+        self.config = BoardConfig(width, height, snakeIconWidth, preyIconWidth, threshold)
+        self.inputsOffset = HEADER.size + OFFSET.size * self.keyframeCount
+
+    def close(self) -> None:
+        """
+            This method unmaps the replay file.
+        """
+        self.data.close()
+
+    def __enter__(self) -> "ReplayPlayer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def directionAt(self, tick: int) -> str:
+        """
+            This method returns the direction the snake moved in
+            on the given tick.
+        """
+        packed = self.data[self.inputsOffset + (tick >> 2)]
+        return DIRECTIONS[(packed >> ((tick & 3) << 1)) & 3]
+
+    def restore(self, game: SnakeEngine, keyframe: int) -> None:
+        """
+            This method sets game to the state stored in a keyframe.
+        """
+        offset, = OFFSET.unpack_from(self.data, HEADER.size + OFFSET.size * keyframe)
+        restoreKeyframe(game, self.data, offset)
+
+    def beforeTick(self, game: SnakeEngine) -> None:
+        """
+            This method prepares game for its next recorded tick: it
+            reseeds the random number generator at keyframes and sets
+            the recorded direction. At the end of the replay it ends
+            the game.
+        """
+        if game.ticks >= self.tickCount:
+            game.gameNotOver = False
+            game.publish({"game_over": game.gameNotOver})
+            return
+        if game.ticks % self.keyframeInterval == 0:
+            game.random.seed(keyframeSeed(self.seed, game.ticks))
+        game.direction = self.directionAt(game.ticks)
+
+    def afterTick(self, game: SnakeEngine) -> None:
+        """
+            This method does nothing; it lets a player be used as
+            a tick hook like a recorder.
+        """
+
+    def seek(self, tick: int, game: SnakeEngine | None = None) -> SnakeEngine:
+        """
+            This method returns a game in the state after the given tick,
+            restored from the nearest keyframe before it and then
+            fast-forwarded. Pass game to restore into an existing game.
+        """
+        tick = max(0, min(tick, self.tickCount))
+        if game is None:
+            game = SnakeEngine(self.config, random.Random(self.seed))
+        self.restore(game, min(tick // self.keyframeInterval, self.keyframeCount - 1))
+        while game.ticks < tick and game.gameNotOver:
+            self.beforeTick(game)
+            game.step()
+        return game
@@ -0,0 +1,205 @@
+"""
+    This module implements a fixed-timestep scheduler for the game loop.
+    Ticks are scheduled on a monotonic clock at multiples of the tick
+    interval, so the time spent in a tick does not add up into drift the
+    way sleeping a fixed time after every tick does.
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+#what to do with the ticks whose time has passed when a tick overran
+SKIP = "skip"           #drop them and wait for the next tick time still ahead
+CATCH_UP = "catch_up"   #run them back to back until the schedule is met again
+
+
+class FixedTimestepScheduler():
+    """
+        This class calls a tick function at a fixed, runtime-adjustable
+        rate and records how late each tick started (jitter) and how
+        often a tick overran its time slot.
+    """
+    def __init__(self, tickInterval: float, policy: str = SKIP, maxCatchUpTicks: int = 5,
+                 jitterSamples: int = 1024, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], object] | None = None) -> None:
+        """
+            The initializer sets the tick interval (sec) and the policy used
+            when falling behind. With CATCH_UP at most maxCatchUpTicks late
+            ticks run back to back before the rest are skipped, so a long
+            stall can't turn into a burst of moves. The last jitterSamples
+            jitter values are kept for percentiles. The scheduler waits
+            with sleep, by default on an event stop() sets so it returns
+            at once.
+        """
+        if policy not in (SKIP, CATCH_UP):
+            raise ValueError(f"unknown scheduling policy: {policy!r}")
+        self.tickInterval = tickInterval
+        self.policy = policy
+        self.maxCatchUpTicks = maxCatchUpTicks
+        self.clock = clock
+        self.stopped = threading.Event()
+        self.sleep = sleep if sleep is not None else self.stopped.wait
+        self.running = False
+        self.lock = threading.Lock()    # stats are read from other threads
+        self.ticks = 0
+        self.overruns = 0
+        self.skippedTicks = 0
+        self.maxJitter = 0.0
+        self.totalJitter = 0.0
+        self.recentJitter: deque[float] = deque(maxlen=jitterSamples)
+
+    def setTickInterval(self, tickInterval: float) -> None:
+        """
+            This method changes the tick interval (sec), for example
+            for a new difficulty level. It applies from the next tick.
+        """
+        if tickInterval <= 0:
+            raise ValueError("tick interval must be positive")
+        self.tickInterval = tickInterval
+
+    def stop(self) -> None:
+        """
+            This method makes run() return before its next tick,
+            waking it up if it is waiting for that tick.
+        """
+        self.running = False
+        self.stopped.set()
+
+    def run(self, tick: Callable[[], bool]) -> None:
+        """
+            This method calls tick once per tick interval until it
+            returns False or stop() is called.
+        """
+        self.running = True
+        self.stopped.clear()
+        nextTick = self.clock()
+        lateTicks = 0   # ticks run back to back while catching up
+        while self.running:
+            now = self.clock()
+            if now < nextTick:
+                self.sleep(nextTick - now)
+                if not self.running:
+                    break   # stop() was called while sleeping
+                now = self.clock()
+            self.recordJitter(now - nextTick)
+            if not tick():
+                break
+            nextTick += self.tickInterval
+            now = self.clock()
+            if now <= nextTick:
+                lateTicks = 0
+                continue
+            # the tick overran its slot: the next tick time has already passed
+            with self.lock:
+                self.overruns += 1
+            if self.policy == CATCH_UP and lateTicks < self.maxCatchUpTicks:
+                lateTicks += 1
+            else:
+                missedTicks = int((now - nextTick) // self.tickInterval) + 1
+                nextTick += missedTicks * self.tickInterval
+                lateTicks = 0
+                with self.lock:
+                    self.skippedTicks += missedTicks
+        self.running = False
+
+    def recordJitter(self, jitter: float) -> None:
+        """
+            This method records how late (sec) a tick started.
+        """
+        with self.lock:
+            self.ticks += 1
+            self.totalJitter += jitter
+            self.maxJitter = max(self.maxJitter, jitter)
+            self.recentJitter.append(jitter)
+
+    def stats(self) -> dict:
+        """
+            This method returns the tick, overrun and jitter statistics
+            so far. It can be called from any thread during a session.
+        """
+        with self.lock:
+            recent = sorted(self.recentJitter)
+            stats = {"tickInterval": self.tickInterval, "policy": self.policy, "ticks": self.ticks,
+                     "overruns": self.overruns, "skippedTicks": self.skippedTicks,
+                     "meanJitter": self.totalJitter / self.ticks if self.ticks else 0.0,
+                     "maxJitter": self.maxJitter}
+        if len(recent) >= 2:
+            percentiles = statistics.quantiles(recent, n=100, method="inclusive")
+            stats["p50Jitter"], stats["p99Jitter"] = percentiles[49], percentiles[98]
+        return stats
+
+
+class TimerWheel():
+    """
+        This class is a hashed timer wheel: it runs callbacks at given
+        times with a resolution of one slot, and scheduling, cancelling
+        and firing cost O(1) per timer however many are pending. It
+        keeps no clock of its own; advance(now) fires what is due, so
+        one wheel can drive thousands of games from a single loop.
+    """
+    def __init__(self, resolution: float = 0.005, slots: int = 512, start: float = 0.0) -> None:
+        """
+            The initializer creates an empty wheel of slots slots, each
+            resolution seconds long, whose slot 0 begins at start.
+        """
+        if resolution <= 0 or slots < 1:
+            raise ValueError("a timer wheel needs a positive resolution and at least one slot")
+        self.resolution = resolution
+        self.start = start
+        #each slot holds [tick, callback] entries, tick being the absolute slot number
+        self.slots: list[list[list]] = [[] for _ in range(slots)]
+        self.current = 0    # absolute number of the next slot to fire
+        self.pending = 0
+
+    def schedule(self, when: float, callback: Callable[[], None]) -> list:
+        """
+            This method arranges for callback to be called once the wheel
+            has advanced past when, at the earliest in the next slot to
+            fire. It returns a handle for cancel().
+        """
+        tick = max(self.current, int(-(-(when - self.start) // self.resolution)))
+        entry = [tick, callback]
+        self.slots[tick % len(self.slots)].append(entry)
+        self.pending += 1
+        return entry
+
+    def cancel(self, entry: list) -> None:
+        """
+            This method stops a scheduled callback from being called.
+            The entry is dropped when its slot comes round.
+        """
+        entry[1] = None
+
+    def nextDeadline(self) -> float:
+        """
+            This method returns the time at which the next slot is due.
+        """
+        return self.start + self.current * self.resolution
+
+    def advance(self, now: float) -> int:
+        """
+            This method fires the callbacks of every slot due by now,
+            in slot order, and returns how many were called. Entries
+            more than a full turn away stay in their slot.
+        """
+        fired = 0
+        due = int((now - self.start) // self.resolution)
+        slotCount = len(self.slots)
+        while self.current <= due:
+            tick = self.current
+            index = tick % slotCount
+            slot = self.slots[index]
+            self.current += 1   # callbacks rescheduling now land in a later slot
+            if not slot:
+                continue
+            self.slots[index] = [entry for entry in slot if entry[0] > tick]
+            for entry in slot:
+                if entry[0] <= tick:
+                    self.pending -= 1
+                    if entry[1] is not None:
+                        entry[1]()
+                        fired += 1
+        return fired
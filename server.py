@@ -0,0 +1,344 @@
+"""
+    This program hosts many independent snake games in one asyncio event
+    loop and lets clients play them over TCP:
+
+        python server.py --port 7777 --tick-interval 0.15
+
+    Every connection gets its own game session. The sessions are headless
+    engine.SnakeEngine games; their ticks are driven by one shared
+    scheduler.TimerWheel instead of a thread or timer per game, so a core
+    can host thousands of them. loadtest.py is a client simulator for it.
+
+    Protocol (little-endian):
+        client -> server   one byte per turn, the index of the direction
+                           in engine.DIRECTIONS; it is applied on a later
+                           tick, at most one turn per tick, and skipped if
+                           it wouldn't change the direction or reverse it
+        server -> client   WELCOME, then SNAPSHOT followed by a replay
+                           keyframe of the initial game state, then one
+                           TICK per tick. A TICK whose flags have ATE set
+                           is followed by GROWTH, one with OVER set by
+                           OVER; the server closes the connection after it.
+    A TICK carries the new head; the client drops its tail, or keeps it
+    and adds the grown tail from GROWTH when the snake ate.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import struct
+import time
+
+from compact_engine import CompactSnakeEngine
+from engine import BoardConfig, DIRECTIONS, SnakeEngine
+from input_buffer import InputBuffer
+from instrumentation import Histogram
+from replay import encodeKeyframe
+from scheduler import TimerWheel
+
+#message types, the first byte of every server message
+WELCOME_MESSAGE, SNAPSHOT_MESSAGE, TICK_MESSAGE = b"W"[0], b"S"[0], b"T"[0]
+#type, session id, seed, board config, tick interval (sec)
+WELCOME = struct.Struct("<BIqHHHHHf")
+#type; a replay.KEYFRAME and its body codes follow
+SNAPSHOT = struct.Struct("<B")
+#type, tick, head x, head y, flags
+TICK = struct.Struct("<BIiiB")
+#grown tail x, grown tail y, score, prey left, prey top
+GROWTH = struct.Struct("<iiIdd")
+#cause of death code
+OVER = struct.Struct("<B")
+#TICK flags
+ATE, GAME_OVER = 1, 2
+CAUSES_OF_DEATH = ("wall", "self", "board_full")
+#turns buffered per session; further turns are dropped until a tick applies one
+MAX_PENDING_TURNS = 4
+#bytes a slow client may leave unsent before its session is dropped
+MAX_WRITE_BUFFER = 64 * 1024
+#seconds a finished session's connection stays half-open for the client to close it
+LINGER_TIME = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+class GameSession():
+    """
+        This class is one client's game: it buffers the client's turns,
+        advances the game on every timer wheel callback and writes the
+        resulting delta to the client.
+    """
+    __slots__ = ("server", "sessionId", "game", "writer", "turns", "deadline", "timer")
+
+    def __init__(self, server: "GameServer", sessionId: int, game: SnakeEngine,
+                 writer: asyncio.StreamWriter) -> None:
+        """
+            The initializer wraps game, which is played for the client
+            connected through writer.
+        """
+        self.server = server
+        self.sessionId = sessionId
+        self.game = game
+        self.writer = writer
+        self.turns = InputBuffer(MAX_PENDING_TURNS, server.inputLatency)
+        self.deadline = 0.0     # time the next tick is due
+        self.timer: list | None = None
+
+    def addTurns(self, data: bytes) -> None:
+        """
+            This method buffers the turns received from the client.
+            Unknown codes are ignored, and so are turns arriving while
+            MAX_PENDING_TURNS are already waiting.
+        """
+        for code in data:
+            if code < len(DIRECTIONS):
+                self.turns.push(DIRECTIONS[code])
+
+    def tick(self) -> None:
+        """
+            This method is the timer wheel callback. A tick that fails
+            is logged and ends this session only, so the wheel goes on
+            driving every other game.
+        """
+        try:
+            self.playTick()
+        except Exception:
+            logger.exception("session %d failed, closing it", self.sessionId)
+            self.server.endSession(self, "error")
+
+    def playTick(self) -> None:
+        """
+            This method plays one tick with the next buffered turn,
+            sends the delta and schedules the next tick, or ends the
+            session when the game is over.
+        """
+        self.server.recordLateness(self.deadline)
+        game = self.game
+        score = game.score
+        turn = self.turns.next(game.direction)
+        game.step(turn[0] if turn is not None else None)
+        if turn is not None:
+            self.turns.recordApplied(turn[1])
+        headX, headY = game.snakeCoordinates[-1]
+        flags = (ATE if game.score != score else 0) | (GAME_OVER if not game.gameNotOver else 0)
+        message = TICK.pack(TICK_MESSAGE, game.ticks, headX, headY, flags)
+        if flags & ATE:
+            tailX, tailY = game.snakeCoordinates[0]
+            message += GROWTH.pack(tailX, tailY, game.score, game.preyCoordinates[0], game.preyCoordinates[1])
+        if flags & GAME_OVER:
+            message += OVER.pack(CAUSES_OF_DEATH.index(game.causeOfDeath))
+        self.writer.write(message)
+        self.server.ticks += 1
+        if flags & GAME_OVER:
+            self.server.endSession(self, game.causeOfDeath)
+        elif self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.server.endSession(self, "slow_client")
+        else:
+            # scheduled from the deadline, not from now, so lateness doesn't add up into drift
+            self.deadline += self.server.tickInterval
+            self.timer = self.server.wheel.schedule(self.deadline, self.tick)
+
+
+class GameServer():
+    """
+        This class accepts TCP connections, starts a GameSession for each
+        and drives all session ticks from one timer wheel.
+    """
+    def __init__(self, config: BoardConfig | None = None, tickInterval: float = 0.15,
+                 resolution: float = 0.005, maxSessions: int = 10_000,
+                 engineClass: type[SnakeEngine] = SnakeEngine, seed: int | None = None) -> None:
+        """
+            The initializer sets the board every game is played on, the
+            tick interval (sec), the timer wheel resolution (sec), the
+            number of sessions over which new connections are refused,
+            the engine class and the seed the session seeds are drawn from.
+        """
+        self.config = config if config is not None else BoardConfig()
+        self.tickInterval = tickInterval
+        self.maxSessions = maxSessions
+        self.engineClass = engineClass
+        self.random = random.Random(seed)
+        self.wheel = TimerWheel(resolution, max(16, int(4 * tickInterval / resolution)))
+        self.sessions: dict[int, GameSession] = {}
+        self.nextSessionId = 1
+        self.ticks = 0
+        self.endings: dict[str, int] = {}
+        #how late (ns) session ticks ran, and how long (ns) a turn of the wheel took
+        self.lateness = Histogram()
+        self.turnDuration = Histogram()
+        #time (ns) from receiving a turn to applying it
+        self.inputLatency = Histogram()
+        self.now = 0.0  # loop time of the current turn of the wheel
+
+    def recordLateness(self, deadline: float) -> None:
+        """
+            This method records how late a session tick ran.
+        """
+        self.lateness.add(max(0, int((self.now - deadline) * 1e9)))
+
+    async def handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+            This method serves one connection: it starts a session, then
+            feeds the client's turns to it until either side ends it.
+        """
+        if len(self.sessions) >= self.maxSessions:
+            writer.close()
+            return
+        sessionId = self.nextSessionId
+        self.nextSessionId += 1
+        seed = self.random.getrandbits(63)
+        game = self.engineClass(self.config, random.Random(seed))
+        session = GameSession(self, sessionId, game, writer)
+        config = self.config
+        writer.write(WELCOME.pack(WELCOME_MESSAGE, sessionId, seed, config.windowWidth, config.windowHeight,
+                                  config.snakeIconWidth, config.preyIconWidth, config.threshold,
+                                  self.tickInterval)
+                     + SNAPSHOT.pack(SNAPSHOT_MESSAGE) + encodeKeyframe(game))
+        self.sessions[sessionId] = session
+        session.deadline = asyncio.get_running_loop().time() + self.tickInterval
+        session.timer = self.wheel.schedule(session.deadline, session.tick)
+        try:
+            while True:     # turns read after the game ended are dropped with the session
+                data = await reader.read(256)
+                if not data:
+                    break
+                session.addTurns(data)
+        except ConnectionError:
+            pass
+        finally:
+            self.endSession(session, "disconnected")
+            writer.close()
+
+    def endSession(self, session: GameSession, reason: str) -> None:
+        """
+            This method stops a session's ticks and closes its connection,
+            once; later calls for the same session do nothing. The
+            connection is only half-closed until the client closes it
+            too, or LINGER_TIME has passed: closing it with turns still
+            unread would reset it and could lose the last deltas.
+        """
+        if self.sessions.pop(session.sessionId, None) is None:
+            return
+        if session.timer is not None:
+            self.wheel.cancel(session.timer)
+        self.endings[reason] = self.endings.get(reason, 0) + 1
+        writer = session.writer
+        if reason != "disconnected" and writer.can_write_eof() and not writer.is_closing():
+            try:
+                writer.write_eof()  # unsent deltas are still flushed
+            except OSError:     # the client is already gone
+                writer.close()
+            else:
+                asyncio.get_running_loop().call_later(LINGER_TIME, writer.close)
+        else:
+            writer.close()
+
+    async def driveWheel(self) -> None:
+        """
+            This method turns the timer wheel for ever: it sleeps until
+            the next slot is due and fires the session ticks due by then.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self.wheel.nextDeadline() - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.now = loop.time()
+            start = time.perf_counter_ns()
+            self.wheel.advance(self.now)
+            self.turnDuration.add(time.perf_counter_ns() - start)
+
+    def stats(self) -> dict:
+        """
+            This method returns the session counts and tick statistics.
+        """
+        return {"sessions": len(self.sessions), "started": self.nextSessionId - 1, "ticks": self.ticks,
+                "endings": dict(self.endings), "lateness": self.lateness.summary(),
+                "inputLatency": self.inputLatency.summary(),
+                "turnDuration": self.turnDuration.summary()}
+
+    async def logStats(self, interval: float) -> None:
+        """
+            This method logs a line of statistics every interval seconds.
+        """
+        lastTicks = 0
+        while True:
+            await asyncio.sleep(interval)
+            late, turn = self.lateness.summary(), self.turnDuration.summary()
+            applied = self.inputLatency.summary()
+            logger.info("%d sessions, %.0f ticks/s, lateness p50 %.1f ms p99 %.1f ms, wheel turn p99 %.1f ms, "
+                        "input to move p99 %.1f ms, %s", len(self.sessions), (self.ticks - lastTicks) / interval,
+                        late["p50"] / 1e6, late["p99"] / 1e6, turn["p99"] / 1e6, applied["p99"] / 1e6, self.endings)
+            lastTicks = self.ticks
+
+    async def serve(self, host: str, port: int, statsInterval: float = 0.0,
+                    ready: asyncio.Future | None = None) -> None:
+        """
+            This method listens on host:port and hosts games until it is
+            cancelled. ready, if given, is set to the bound port.
+        """
+        self.wheel.start = asyncio.get_running_loop().time()
+        server = await asyncio.start_server(self.handleClient, host, port, backlog=4096)
+        tasks = [asyncio.create_task(self.driveWheel())]
+        if statsInterval > 0:
+            tasks.append(asyncio.create_task(self.logStats(statsInterval)))
+        port = server.sockets[0].getsockname()[1]
+        logger.info("serving snake games on %s:%d", host, port)
+        if ready is not None:
+            ready.set_result(port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            for session in list(self.sessions.values()):
+                self.endSession(session, "shutdown")
+
+
+def raiseFileLimit() -> None:
+    """
+        This function raises the soft limit on open files to the hard
+        limit where the platform allows it, as every session holds a
+        socket.
+    """
+    try:
+        import resource
+    except ImportError:   # not available on Windows
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limit = hard if hard != resource.RLIM_INFINITY else max(soft, 1 << 16)
+    if soft != resource.RLIM_INFINITY and soft < limit:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+        This function parses the command line and runs the server
+        until it is interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Host many snake games over TCP in one event loop.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7777, help="port to listen on (0 picks a free one)")
+    parser.add_argument("--tick-interval", type=float, default=0.15, help="seconds between the ticks of a game")
+    parser.add_argument("--resolution", type=float, default=0.005, help="timer wheel slot length in seconds")
+    parser.add_argument("--max-sessions", type=int, default=10_000, help="sessions over which connections are refused")
+    parser.add_argument("--width", type=int, default=500, help="board width in pixels")
+    parser.add_argument("--height", type=int, default=300, help="board height in pixels")
+    parser.add_argument("--compact", action="store_true", help="play with the memory-compact engine")
+    parser.add_argument("--seed", type=int, help="seed the session seeds are drawn from")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="seconds between statistics log lines (0 = off)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    raiseFileLimit()
+    gameServer = GameServer(BoardConfig(args.width, args.height), args.tick_interval, args.resolution,
+                            args.max_sessions, CompactSnakeEngine if args.compact else SnakeEngine, args.seed)
+    try:
+        asyncio.run(gameServer.serve(args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
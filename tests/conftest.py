@@ -0,0 +1,8 @@
+"""
+    This file lets the tests import the game's modules, which live
+    in the directory above.
+"""
+
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
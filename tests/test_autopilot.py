@@ -0,0 +1,25 @@
+"""
+    These tests play headless games with the autopilot.
+"""
+
+import random
+
+from autopilot import Autopilot
+from engine import BoardConfig, SnakeEngine
+
+
+def testEatingMoveNeverEntersTheTailCell() -> None:
+    """
+        When a move eats, the tail grows back where it was, so the head
+        must not move onto the cell the tail is leaving. Seed 3 used to
+        die that way at tick 3674.
+    """
+    game = SnakeEngine(BoardConfig(), random.Random(3))
+    autopilot = Autopilot(game.config, budget=10)
+    while game.gameNotOver and game.ticks < 4000:
+        tail, score = game.snakeCoordinates[0], game.score
+        lastResorts = autopilot.counts["lastResorts"]
+        game.step(autopilot.decide(game))
+        if game.score > score and game.snakeCoordinates[-1] == tail:
+            assert autopilot.counts["lastResorts"] > lastResorts
+    assert game.gameNotOver
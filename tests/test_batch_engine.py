@@ -0,0 +1,59 @@
+"""
+    These tests check that batch_engine.BatchEngine plays by the same
+    rules as engine.SnakeEngine.
+"""
+
+import random
+
+import pytest
+
+from engine import BoardConfig, DIRECTIONS, SnakeEngine
+from tournament import greedyBot
+
+np = pytest.importorskip("numpy")
+from batch_engine import BatchEngine, CAUSES_OF_DEATH, KEEP_DIRECTION  # needs numpy
+
+
+def testBatchEngineMatchesSnakeEngine() -> None:
+    """
+        Games steered the same way, with the prey of every SnakeEngine
+        copied into its batched game (their random numbers differ),
+        have the same bodies, scores and causes of death on every tick.
+    """
+    config = BoardConfig()
+    seeds = range(12)
+    games = [SnakeEngine(config, random.Random(seed)) for seed in seeds]
+    batch = BatchEngine(len(games), config, seed=0)
+    steering = random.Random(0)
+
+    def copyPrey(i: int) -> None:
+        batch.preyX[i], batch.preyY[i] = games[i].preyCoordinates[:2]
+
+    for i in range(len(games)):
+        copyPrey(i)
+    eaten = 0
+    while any(game.gameNotOver for game in games) and games[0].ticks < 3000:
+        directions = np.full(len(games), KEEP_DIRECTION, dtype=np.int8)
+        for i, game in enumerate(games):
+            if not game.gameNotOver:
+                continue
+            # chase the prey so snakes grow, or go straight on into a wall, with random turns into the body
+            if steering.random() < 0.2:
+                direction = steering.choice(DIRECTIONS)
+            else:
+                direction = greedyBot(game) if i % 3 else game.direction
+            directions[i] = DIRECTIONS.index(direction)
+            score = game.score
+            game.step(direction)
+            eaten += game.score - score
+        batch.step(directions)
+        for i, game in enumerate(games):
+            assert batch.snakeCoordinates(i) == list(game.snakeCoordinates)
+            assert batch.score[i] == game.score
+            assert batch.directionName(i) == game.direction
+            assert bool(batch.alive[i]) == game.gameNotOver
+            assert CAUSES_OF_DEATH[batch.causeOfDeath[i]] == game.causeOfDeath
+            if game.gameNotOver:
+                copyPrey(i)
+    assert eaten > 50
+    assert {game.causeOfDeath for game in games} >= {"wall", "self"}
@@ -0,0 +1,64 @@
+"""
+    These tests check that compact_engine.CompactSnakeEngine plays by
+    the same rules as engine.SnakeEngine.
+"""
+
+import random
+
+from compact_engine import CompactSnakeEngine
+from engine import BoardConfig, DIRECTIONS, SnakeEngine
+from tournament import greedyBot
+
+
+def testCompactSnakeEngineMatchesSnakeEngine() -> None:
+    """
+        Games with the same seed steered the same way have the same
+        bodies, occupancy, prey, scores and causes of death on every tick.
+    """
+    config = BoardConfig()
+    seeds = range(12)
+    games = [SnakeEngine(config, random.Random(seed)) for seed in seeds]
+    compactGames = [CompactSnakeEngine(config, random.Random(seed)) for seed in seeds]
+    steering = random.Random(0)
+    eaten = 0
+    while any(game.gameNotOver for game in games) and games[0].ticks < 3000:
+        for i, (game, compactGame) in enumerate(zip(games, compactGames)):
+            if not game.gameNotOver:
+                continue
+            # chase the prey so snakes grow, or go straight on into a wall, with random turns into the body
+            if steering.random() < 0.1:
+                direction = steering.choice(DIRECTIONS)
+            else:
+                direction = greedyBot(game) if i % 3 else game.direction
+            score = game.score
+            game.step(direction)
+            compactGame.step(direction)
+            eaten += game.score - score
+            assert list(compactGame.snakeCoordinates) == list(game.snakeCoordinates)
+            onBoard = [coordinate for coordinate in game.occupiedCells if config.cell(coordinate) >= 0]
+            assert [compactGame.occupiedCells[coordinate] for coordinate in onBoard] == \
+                [game.occupiedCells[coordinate] for coordinate in onBoard]
+            assert sum(compactGame.occupiedCells.counts) == sum(game.occupiedCells[c] for c in onBoard)
+            assert compactGame.preyCoordinates == game.preyCoordinates
+            assert (compactGame.score, compactGame.direction, compactGame.gameNotOver, compactGame.causeOfDeath) == \
+                (game.score, game.direction, game.gameNotOver, game.causeOfDeath)
+    assert eaten > 50
+    assert max(len(game.snakeCoordinates) for game in games) > 16    # the ring buffers grew
+    assert {game.causeOfDeath for game in games} >= {"wall", "self"}
+
+
+def testLatticeCells() -> None:
+    """
+        BoardConfig.cell numbers the lattice cells inside the board row
+        by row, and coordinate maps them back.
+    """
+    config = BoardConfig(200, 150)
+    cells = [config.cell(config.coordinate(column, row))
+             for row in range(config.rows) for column in range(config.columns)]
+    assert cells == list(range(config.columns * config.rows))
+    x, y = config.coordinate(config.columns - 1, config.rows - 1)
+    assert x < config.windowWidth <= x + config.preyIconWidth
+    assert y < config.windowHeight <= y + config.preyIconWidth
+    for outside in ((x + config.preyIconWidth, y), (x, y + config.preyIconWidth), (x - 1, y),
+                    (config.xOrigin - config.preyIconWidth, y)):
+        assert config.cell(outside) == -1
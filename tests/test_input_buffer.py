@@ -0,0 +1,72 @@
+"""
+    These tests check how input_buffer.InputBuffer queues the turns
+    pressed between ticks.
+"""
+
+import random
+
+from engine import SnakeEngine
+from input_buffer import InputBuffer
+
+
+def tick(game: SnakeEngine, inputs: InputBuffer) -> None:
+    """
+        This function plays one tick with the next buffered turn,
+        as the game loop does.
+    """
+    turn = inputs.next(game.direction)
+    game.step(turn[0] if turn is not None else None)
+
+
+def testTwoPressesWithinOneTickAreAppliedInOrder() -> None:
+    """
+        Up then Right pressed during one tick of a snake moving Left
+        turn it Up on the next tick and Right on the one after, where
+        Right alone would have been refused as a reversal.
+    """
+    game = SnakeEngine(rng=random.Random(0))
+    inputs = InputBuffer()
+    assert inputs.push("Up") and inputs.push("Right")
+    tick(game, inputs)
+    assert game.direction == "Up"
+    tick(game, inputs)
+    assert game.direction == "Right"
+    tick(game, inputs)
+    assert game.direction == "Right"
+    assert inputs.report()["rejected"] == 0
+
+
+def testPressesRepeatingOrReversingTheLastQueuedTurnAreRejected() -> None:
+    """
+        A press that repeats or reverses the turn queued before it is
+        ignored and takes no room in the buffer; one that reverses the
+        direction applied last is rejected when the game takes it.
+    """
+    inputs = InputBuffer(capacity=2)
+    assert inputs.push("Up")
+    assert not inputs.push("Up")
+    assert not inputs.push("Down")
+    assert inputs.push("Left")
+    assert inputs.next("Left")[0] == "Up"
+    assert inputs.next("Up")[0] == "Left"
+    assert inputs.next("Left") is None
+    assert inputs.push("Right")    # nothing queued: checked against the applied direction when taken
+    assert inputs.next("Left") is None
+    report = inputs.report()
+    assert (report["pushed"], report["dropped"], report["rejected"]) == (3, 0, 3)
+
+
+def testPressesBeyondCapacityAreDropped() -> None:
+    """
+        Once capacity turns are waiting, further presses are dropped
+        and the waiting turns are kept.
+    """
+    inputs = InputBuffer(capacity=2, clock=iter(range(100)).__next__)
+    assert inputs.push("Up") and inputs.push("Right")
+    assert not inputs.push("Down")
+    assert not inputs.push("Up")
+    assert inputs.next("Left") == ("Up", 0)
+    assert inputs.next("Up") == ("Right", 1)
+    assert inputs.next("Right") is None
+    report = inputs.report()
+    assert (report["pushed"], report["dropped"], report["rejected"]) == (2, 2, 0)
@@ -0,0 +1,129 @@
+"""
+    These tests render games of part_1 on a stub canvas, to check the
+    "delta" render mode draws only what changed and reuses its items.
+"""
+
+import queue
+import random
+
+import pytest
+
+pytest.importorskip("tkinter")
+import part_1  # needs tkinter
+from engine import BoardConfig
+from tournament import greedyBot
+
+
+class StubCanvas():
+    """
+        This class stands in for the tkinter canvas: it keeps the
+        coordinates and state of every item and logs the changes.
+    """
+    def __init__(self) -> None:
+        self.items: dict[int, dict] = {}
+        self.changes: list[tuple] = []
+
+    def create(self, kind: str, points: tuple) -> int:
+        item = len(self.items) + 1
+        self.items[item] = {"kind": kind, "coords": points, "state": "normal"}
+        self.changes.append(("create", item))
+        return item
+
+    def create_line(self, start: tuple[int, int], end: tuple[int, int], **options) -> int:
+        return self.create("line", (*start, *end))
+
+    def create_rectangle(self, *points: int, **options) -> int:
+        return self.create("rectangle", points)
+
+    def create_text(self, *points: int, **options) -> int:
+        return self.create("text", points)
+
+    def coords(self, item: int, *points: int) -> None:
+        self.items[item]["coords"] = points
+        self.changes.append(("coords", item))
+
+    def itemconfigure(self, item: int, **options) -> None:
+        self.items[item].update(options)
+        self.changes.append(("configure", item))
+
+    def visibleSegments(self) -> list[tuple]:
+        """
+            This method returns the coordinates of the shown lines.
+        """
+        return sorted(item["coords"] for item in self.items.values()
+                      if item["kind"] == "line" and item["state"] == "normal")
+
+    def lineChanges(self) -> list[tuple]:
+        """
+            This method returns the logged changes of lines.
+        """
+        return [change for change in self.changes if self.items[change[1]]["kind"] == "line"]
+
+
+class StubRoot():
+    """
+        This class stands in for the Tk root; it forgets what is scheduled.
+    """
+    def after(self, *args) -> None:
+        pass
+
+
+def segments(snakeCoordinates) -> list[tuple]:
+    """
+        This function returns the coordinates of the segments
+        that draw a snake.
+    """
+    body = list(snakeCoordinates)
+    return sorted((*start, *end) for start, end in zip(body, body[1:]))
+
+
+def testDeltaRenderingMovesOnlyTheChangedSegments(monkeypatch) -> None:
+    """
+        Every frame of a one tick move shows the snake's segments, and
+        changes only the item of the dropped tail, moved to the new head,
+        and the item of a grown tail.
+    """
+    game = part_1.Game(BoardConfig(), queue.Queue(), random.Random(1), "delta")
+    gui = part_1.Gui.__new__(part_1.Gui)     # no Tk window
+    gui.canvas, gui.root = StubCanvas(), StubRoot()
+    gui.segmentItems, gui.segmentCoordinates, gui.segmentPool = part_1.deque(), part_1.deque(), []
+    for name, value in (("gameQueue", game.queue), ("gui", gui), ("game", game),
+                        ("ICON_COLOUR", "yellow"), ("SNAKE_ICON_WIDTH", 15)):
+        monkeypatch.setattr(part_1, name, value, raising=False)
+    canvas = gui.canvas
+    gui.preyIcon, gui.score = canvas.create_rectangle(0, 0, 0, 0), canvas.create_text(60, 15)
+    handler = part_1.QueueHandler()
+
+    grown = 0
+    for _ in range(200):
+        game.inputs.push(greedyBot(game))
+        length = len(game.snakeCoordinates)
+        segmentItems = list(gui.segmentItems)
+        assert game.tick()
+        canvas.changes.clear()
+        handler.queueHandler()
+        assert canvas.visibleSegments() == segments(game.snakeCoordinates)
+        if game.ticks == 1:
+            continue    # the first frame draws the whole snake
+        changes = canvas.lineChanges()
+        # the tail's item is moved to the new head, the others are left alone
+        assert changes[0] == ("coords", segmentItems[0])
+        if len(game.snakeCoordinates) == length:
+            assert changes == [("coords", segmentItems[0])]
+        else:
+            # the new tail segment is the only item created, or taken from the pool
+            grown += 1
+            assert len(changes) == 2 and changes[1][1] == gui.segmentItems[0]
+    assert grown > 3
+    # one item per segment: moving never needs a spare one
+    lines = [item for item in canvas.items.values() if item["kind"] == "line"]
+    assert len(lines) == len(game.snakeCoordinates) - 1
+
+    # a new snapshot redraws the snake with the pooled items of the old drawing
+    game.needsSnapshot = True
+    assert game.tick()
+    canvas.changes.clear()
+    handler.queueHandler()
+    assert canvas.visibleSegments() == segments(game.snakeCoordinates)
+    assert not any(change == "create" for change, _ in canvas.changes)
+    assert len(canvas.items) == len(lines) + 2
@@ -0,0 +1,64 @@
+"""
+    These tests run the batched producer/consumer pipeline of part_2.
+"""
+
+import os
+
+import pytest
+
+import part_2
+
+
+def failingWork(item: int) -> None:
+    """
+        A work function failing on one of the items.
+    """
+    if item == 7:
+        raise ValueError("failed on 7")
+
+
+def crashingWork(item: int) -> None:
+    """
+        A work function ending its process on one of the items.
+    """
+    if item == 7:
+        os._exit(3)
+
+
+@pytest.mark.parametrize("backend", part_2.BACKENDS)
+def testPipelineRaisesTheWorkError(backend: str) -> None:
+    """
+        An error in the work must reach the caller instead of leaving
+        the producers blocked on a full queue.
+    """
+    with pytest.raises(ValueError, match="failed on 7"):
+        part_2.runPipeline(4, 2, 5000, (1, 100), batchSize=16, queueSize=4, work=failingWork, backend=backend)
+
+
+@pytest.mark.parametrize("backend", part_2.BACKENDS)
+def testPipelineRaisesTheProducerError(backend: str) -> None:
+    """
+        A producer that fails, here on an empty item range, must not
+        let the pipeline report the items it never made.
+    """
+    # a producer process can only report its crash, through its exit code
+    with pytest.raises(RuntimeError if backend == "processes" else ValueError):
+        part_2.runPipeline(2, 2, 1000, (100, 1), batchSize=16, queueSize=4, backend=backend)
+
+
+def testProcessPipelineReportsACrashedConsumer() -> None:
+    """
+        A consumer process that dies never sends its results, which
+        must not leave the caller waiting for them.
+    """
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        part_2.runPipeline(2, 2, 5000, (1, 100), batchSize=16, queueSize=4, work=crashingWork, backend="processes")
+
+
+@pytest.mark.parametrize("backend", part_2.BACKENDS)
+def testPipelineConsumesEveryItem(backend: str) -> None:
+    """
+        Every batch produced is consumed and has its latency recorded.
+    """
+    report = part_2.runPipeline(2, 2, 1000, (1, 100), batchSize=16, queueSize=4, backend=backend)
+    assert report["items"] == 2000
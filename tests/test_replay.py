@@ -0,0 +1,65 @@
+"""
+    These tests record games to replay files and play them back.
+"""
+
+import random
+
+import pytest
+
+from engine import BoardConfig, DIRECTIONS, SnakeEngine
+from replay import HEADER, MAGIC, VERSION, ReplayPlayer, ReplayRecorder
+from tournament import greedyBot
+
+
+def state(game: SnakeEngine) -> tuple:
+    """
+        This function returns what a replay must reproduce of a game.
+    """
+    return (game.ticks, game.score, game.direction, list(game.snakeCoordinates), game.preyCoordinates,
+            game.gameNotOver, game.causeOfDeath)
+
+
+def testSeekReproducesEveryRecordedTick(tmp_path) -> None:
+    """
+        Seeking to any tick, forwards or backwards, into a new game or
+        into the one being played back, gives the state the recorded
+        game had after that tick.
+    """
+    seed = 7
+    game = SnakeEngine(BoardConfig(), random.Random(seed))
+    recorder = ReplayRecorder(game, seed, keyframeInterval=16)
+    steering = random.Random(seed)
+    recorded = [state(game)]
+    while game.gameNotOver:
+        recorder.step(greedyBot(game) if steering.random() < 0.9 else steering.choice(DIRECTIONS))
+        recorded.append(state(game))
+    path = str(tmp_path / "game.snkr")
+    recorder.save(path)
+
+    with ReplayPlayer(path) as player:
+        assert player.tickCount == len(recorded) - 1
+        assert player.keyframeCount == (player.tickCount - 1) // 16 + 1
+        for tick in range(len(recorded)):
+            assert state(player.seek(tick)) == recorded[tick]
+        # one game jumping around, as the GUI's --replay-from does
+        replayed = player.seek(0)
+        for tick in (len(recorded) - 1, 17, 16, 15, 1, len(recorded) // 2, 0):
+            assert state(player.seek(tick, replayed)) == recorded[tick]
+        # and playing on tick by tick after a seek
+        replayed = player.seek(5)
+        while replayed.ticks < player.tickCount:
+            player.beforeTick(replayed)
+            replayed.step()
+            assert state(replayed) == recorded[replayed.ticks]
+
+
+def testReplayWithoutKeyframesIsRefused(tmp_path) -> None:
+    """
+        A replay whose header counts no keyframes can't be opened.
+    """
+    path = tmp_path / "empty.snkr"
+    config = BoardConfig()
+    path.write_bytes(HEADER.pack(MAGIC, VERSION, config.windowWidth, config.windowHeight, config.snakeIconWidth,
+                                 config.preyIconWidth, config.threshold, 7, 16, 0, 0))
+    with pytest.raises(ValueError, match="no keyframes"):
+        ReplayPlayer(str(path))
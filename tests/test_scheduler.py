@@ -0,0 +1,103 @@
+"""
+    These tests drive the fixed-timestep scheduler with a fake clock.
+"""
+
+import threading
+
+from scheduler import CATCH_UP, SKIP, FixedTimestepScheduler
+
+
+def runTicks(policy: str, durations: list[float], maxCatchUpTicks: int = 5) -> tuple[list[float], FixedTimestepScheduler]:
+    """
+        This function runs one tick per duration on a fake clock, every
+        tick taking its duration, and returns the times the ticks started
+        with the scheduler. The durations are multiples of 1/64 sec so
+        the times are exact.
+    """
+    now = [0.0]
+    starts = []
+    def tick() -> bool:
+        starts.append(now[0])
+        now[0] += durations[len(starts) - 1]
+        return len(starts) < len(durations)
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+    scheduler = FixedTimestepScheduler(0.125, policy, maxCatchUpTicks, clock=lambda: now[0], sleep=sleep)
+    scheduler.run(tick)
+    return starts, scheduler
+
+
+def testTicksDoNotDrift() -> None:
+    """
+        Ticks start at multiples of the tick interval, however long
+        they take, as long as they fit in it.
+    """
+    starts, scheduler = runTicks(SKIP, [0.0, 0.046875, 0.109375, 0.015625] * 25)
+    assert starts == [0.125 * tick for tick in range(100)]
+    stats = scheduler.stats()
+    assert (stats["ticks"], stats["overruns"], stats["skippedTicks"], stats["maxJitter"]) == (100, 0, 0, 0.0)
+
+
+def testSkipDropsTheMissedTicks() -> None:
+    """
+        With SKIP, the ticks whose time passed during a slow tick are
+        dropped and the schedule goes on from the next tick time ahead.
+    """
+    starts, scheduler = runTicks(SKIP, [0.0, 0.0, 0.4375, 0.0, 0.0])
+    assert starts == [0.0, 0.125, 0.25, 0.75, 0.875]
+    stats = scheduler.stats()
+    assert (stats["overruns"], stats["skippedTicks"], stats["maxJitter"]) == (1, 3, 0.0)
+
+
+def testCatchUpRunsAtMostMaxCatchUpTicksLateTicks() -> None:
+    """
+        With CATCH_UP, the ticks missed during a slow tick run back to
+        back, up to maxCatchUpTicks of them; the rest are skipped.
+    """
+    starts, scheduler = runTicks(CATCH_UP, [0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0], maxCatchUpTicks=2)
+    assert starts == [0.0, 0.125, 0.25, 1.25, 1.25, 1.375, 1.5]
+    stats = scheduler.stats()
+    assert (stats["overruns"], stats["skippedTicks"], stats["maxJitter"]) == (3, 6, 0.875)
+
+
+def testCatchUpMeetsTheScheduleAgain() -> None:
+    """
+        With CATCH_UP, a short stall is made up in full and no tick
+        is skipped.
+    """
+    starts, scheduler = runTicks(CATCH_UP, [0.0, 0.25, 0.0, 0.0, 0.0, 0.0])
+    assert starts == [0.0, 0.125, 0.375, 0.375, 0.5, 0.625]
+    assert scheduler.stats()["skippedTicks"] == 0
+
+
+def testStopDuringTheSleepRunsNoMoreTicks() -> None:
+    """
+        A stop() that comes while run() waits for the next tick time
+        ends the run before that tick.
+    """
+    now = [0.0]
+    ticks = []
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+        if len(ticks) == 3:
+            scheduler.stop()
+    scheduler = FixedTimestepScheduler(0.1, clock=lambda: now[0], sleep=sleep)
+    scheduler.run(lambda: ticks.append(now[0]) or True)
+    assert len(ticks) == 3
+
+
+def testStopWakesTheScheduler() -> None:
+    """
+        stop() interrupts the wait for the next tick instead of
+        letting it run to the end.
+    """
+    ticks = []
+    scheduler = FixedTimestepScheduler(60.0)
+    thread = threading.Thread(target=scheduler.run, args=(lambda: ticks.append(1) or True,))
+    thread.start()
+    while not ticks:
+        threading.Event().wait(0.001)
+    scheduler.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert ticks == [1]
@@ -0,0 +1,138 @@
+"""
+    These tests play games against server.py over TCP.
+"""
+
+import asyncio
+import logging
+import random
+
+import server
+from engine import BoardConfig, DIRECTIONS, SnakeEngine
+from loadtest import MirrorGame
+from replay import DIRECTION_CODES, KEYFRAME, keyframeSize
+from tournament import greedyBot
+
+
+class FailingEngine(SnakeEngine):
+    """
+        A game whose third tick fails, if it is the first one created.
+    """
+    __slots__ = ("fails",)
+    games = 0
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        FailingEngine.games += 1
+        self.fails = FailingEngine.games == 1
+
+    def step(self, direction: str | None = None) -> bool:
+        if self.fails and self.ticks == 2:
+            raise RuntimeError("broken game")
+        return super().step(direction)
+
+
+async def join(port: int) -> tuple[asyncio.StreamReader, asyncio.StreamWriter, MirrorGame, SnakeEngine]:
+    """
+        This function connects to the server and reads the start of a
+        game; it returns the connection, the client's mirror of the game
+        and a local game replaying it from the seed in the WELCOME.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    welcome = await reader.readexactly(server.WELCOME.size)
+    _, _, seed, width, height, snakeIconWidth, preyIconWidth, threshold, _ = server.WELCOME.unpack(welcome)
+    config = BoardConfig(width, height, snakeIconWidth, preyIconWidth, threshold)
+    assert (await reader.readexactly(server.SNAPSHOT.size))[0] == server.SNAPSHOT_MESSAGE
+    keyframe = await reader.readexactly(KEYFRAME.size)
+    keyframe += await reader.readexactly(keyframeSize(keyframe, 0) - KEYFRAME.size)
+    replica = SnakeEngine(config, random.Random(seed))
+    mirror = MirrorGame(config, keyframe)
+    assert list(mirror.snakeCoordinates) == list(replica.snakeCoordinates)
+    assert mirror.preyCoordinates == replica.preyCoordinates
+    return reader, writer, mirror, replica
+
+
+async def playToTheEnd(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, mirror: MirrorGame,
+                       replica: SnakeEngine) -> str:
+    """
+        This function steers the game with greedyBot until it is over,
+        checking every delta against the local replica, and returns the
+        cause of death the server sent.
+    """
+    while True:
+        _, tick, headX, headY, flags = server.TICK.unpack(await reader.readexactly(server.TICK.size))
+        grownTail = None
+        if flags & server.ATE:
+            tailX, tailY, score, preyLeft, preyTop = server.GROWTH.unpack(await reader.readexactly(server.GROWTH.size))
+            grownTail = (tailX, tailY)
+        # the direction the server moved in is the turn it applied, if any
+        direction = mirror.applyTick((headX, headY), grownTail)
+        replica.step(direction)
+        assert tick == replica.ticks
+        assert list(mirror.snakeCoordinates) == list(replica.snakeCoordinates)
+        assert bool(flags & server.ATE) == (replica.score != mirror.score)
+        if flags & server.ATE:
+            mirror.score = score
+            mirror.preyCoordinates = replica.preyCoordinates
+            assert (score, preyLeft, preyTop) == (replica.score, *replica.preyCoordinates[:2])
+        if flags & server.GAME_OVER:
+            code, = server.OVER.unpack(await reader.readexactly(server.OVER.size))
+            assert await reader.read() == b""  # the server closes the connection
+            assert not replica.gameNotOver
+            return server.CAUSES_OF_DEATH[code]
+        turn = greedyBot(mirror)
+        if turn != mirror.direction:
+            writer.write(bytes((DIRECTION_CODES[turn],)))
+
+
+async def runServer(gameServer: server.GameServer, play) -> None:
+    """
+        This function serves games on a free port while play(port) runs.
+    """
+    ready = asyncio.get_running_loop().create_future()
+    serving = asyncio.create_task(gameServer.serve("127.0.0.1", 0, ready=ready))
+    try:
+        await asyncio.wait_for(play(await ready), 30)
+    finally:
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+
+
+def testClientMirrorsTheServerGame() -> None:
+    """
+        A client applying the deltas, and steering, follows the game the
+        server plays tick by tick until the game over.
+    """
+    gameServer = server.GameServer(tickInterval=0.002, resolution=0.001, seed=1)
+
+    async def play(port: int) -> None:
+        games = [await join(port) for _ in range(3)]
+        causes = await asyncio.gather(*(playToTheEnd(*game) for game in games))
+        assert causes == [replica.causeOfDeath for _, _, _, replica in games]
+        assert sum(replica.score for _, _, _, replica in games) > 0
+
+    asyncio.run(runServer(gameServer, play))
+    assert gameServer.sessions == {}
+
+
+def testFailingSessionEndsAlone(caplog) -> None:
+    """
+        A session whose tick raises is logged and closed; the other
+        sessions keep being played.
+    """
+    FailingEngine.games = 0
+    gameServer = server.GameServer(tickInterval=0.002, resolution=0.001, engineClass=FailingEngine, seed=1)
+
+    async def play(port: int) -> None:
+        brokenReader, brokenWriter, _, _ = await join(port)
+        game = await join(port)
+        # the broken session sends its first two ticks, then its connection closes
+        for _ in range(2):
+            await brokenReader.readexactly(server.TICK.size)
+        assert await brokenReader.read() == b""
+        brokenWriter.close()
+        await playToTheEnd(*game)
+
+    with caplog.at_level(logging.ERROR, logger="server"):
+        asyncio.run(runServer(gameServer, play))
+    assert gameServer.endings.get("error") == 1
+    assert "session 1 failed" in caplog.text
@@ -0,0 +1,224 @@
+"""
+    This program runs many seeded headless snake games spread over all
+    cores with a process pool and aggregates their results, for example
+    for nightly bot regression runs:
+
+        python tournament.py --games 10000 --workers 8 --chunk-size 100
+
+    Each worker plays the game rules of part_1.Game through the headless
+    engine.SnakeEngine, steered by a bot, and sends the per-game results
+    (score, length, ticks survived, cause of death, time per decision)
+    back one chunk at a time. --bot autopilot steers with
+    autopilot.Autopilot instead of the greedy bot.
+    With --compact games use compact_engine.CompactSnakeEngine, whose memory
+    stays small and predictable on very large boards, and the summary
+    reports the memory each game held when it ended.
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+
+from autopilot import Autopilot
+from compact_engine import CompactSnakeEngine
+from engine import BoardConfig, OPPOSITE_DIRECTIONS, SnakeEngine
+
+
+def greedyBot(game: SnakeEngine) -> str:
+    """
+        This function picks the direction of the next move: towards the
+        prey, preferring moves that don't hit a wall or the snake on the
+        very next tick.
+    """
+    headX, headY = game.snakeCoordinates[-1]
+    preyX = (game.preyCoordinates[0] + game.preyCoordinates[2]) / 2
+    preyY = (game.preyCoordinates[1] + game.preyCoordinates[3]) / 2
+    step = game.config.preyIconWidth
+    # try directions in order of how much they close the distance to the prey
+    gains = {"Right": preyX - headX, "Left": headX - preyX, "Down": preyY - headY, "Up": headY - preyY}
+    for direction in sorted(gains, key=gains.get, reverse=True):
+        if direction == OPPOSITE_DIRECTIONS[game.direction]:
+            continue
+        x = headX + step * ((direction == "Right") - (direction == "Left"))
+        y = headY + step * ((direction == "Down") - (direction == "Up"))
+        if (0 < x < game.config.windowWidth and 0 < y < game.config.windowHeight
+                and (x, y) not in game.occupiedCells):
+            return direction
+    return game.direction
+
+
+#builds the bot for a board: a function from a game to the direction of its next move
+BOTS: dict[str, Callable[[BoardConfig, float], Callable[[SnakeEngine], str]]] = {
+    "greedy": lambda config, budget: greedyBot,
+    "autopilot": lambda config, budget: Autopilot(config, budget).decide,
+}
+
+
+def playGame(seed: int, config: BoardConfig, maxTicks: int,
+             engineClass: type[SnakeEngine] = SnakeEngine,
+             bot: Callable[[SnakeEngine], str] = greedyBot) -> dict:
+    """
+        This function plays one game with the given seed until it is over
+        or maxTicks ticks have passed, and returns its result.
+    """
+    game = engineClass(config, random.Random(seed))
+    clock = time.perf_counter_ns
+    decisionTime = maxDecisionTime = 0
+    while game.gameNotOver and game.ticks < maxTicks:
+        start = clock()
+        direction = bot(game)
+        elapsed = clock() - start
+        decisionTime += elapsed
+        maxDecisionTime = max(maxDecisionTime, elapsed)
+        game.step(direction)
+    return {"seed": seed, "score": game.score, "length": len(game.snakeCoordinates),
+            "ticks": game.ticks, "causeOfDeath": game.causeOfDeath or "max_ticks",
+            "memory": game.memoryUsage()["total"],
+            "decisionUs": decisionTime / max(1, game.ticks) / 1000, "maxDecisionUs": maxDecisionTime / 1000}
+
+
+def playChunk(seeds: list[int], config: BoardConfig, maxTicks: int,
+              engineClass: type[SnakeEngine] = SnakeEngine, botName: str = "greedy",
+              budget: float = 0.002) -> list[dict]:
+    """
+        This function is the target of the pool workers: it plays
+        a chunk of games and returns their results together.
+    """
+    bot = BOTS[botName](config, budget)     # built here, as bots need not be picklable
+    return [playGame(seed, config, maxTicks, engineClass, bot) for seed in seeds]
+
+
+def runTournament(seeds: range, workers: int, chunkSize: int, config: BoardConfig,
+                  maxTicks: int, engineClass: type[SnakeEngine] = SnakeEngine,
+                  botName: str = "greedy", budget: float = 0.002) -> Iterator[list[dict]]:
+    """
+        This function plays a game for each seed on a pool of workers
+        processes and yields the results chunk by chunk as they finish.
+    """
+    chunks = [list(seeds[i:i + chunkSize]) for i in range(0, len(seeds), chunkSize)]
+    worker = functools.partial(playChunk, config=config, maxTicks=maxTicks, engineClass=engineClass,
+                               botName=botName, budget=budget)
+    if workers == 1:
+        # no pool needed, which also keeps single process profiling simple
+        yield from map(worker, chunks)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(worker, chunks)
+
+
+def summarize(results: list[dict], seconds: float) -> dict:
+    """
+        This function aggregates per-game results into summary
+        statistics and throughput.
+    """
+    if not results:
+        return {"games": 0, "seconds": seconds, "gamesPerSecond": 0.0, "ticksPerSecond": 0.0}
+    scores = [result["score"] for result in results]
+    ticks = [result["ticks"] for result in results]
+    return {
+        "games": len(results),
+        "meanScore": statistics.fmean(scores),
+        "medianScore": statistics.median(scores),
+        "maxScore": max(scores),
+        "scoreStdev": statistics.pstdev(scores),
+        "meanLength": statistics.fmean(result["length"] for result in results),
+        "meanTicks": statistics.fmean(ticks),
+        "causesOfDeath": dict(Counter(result["causeOfDeath"] for result in results)),
+        "meanMemory": statistics.fmean(result["memory"] for result in results),
+        "maxMemory": max(result["memory"] for result in results),
+        "meanDecisionUs": statistics.fmean(result["decisionUs"] for result in results),
+        "maxDecisionUs": max(result["maxDecisionUs"] for result in results),
+        "seconds": seconds,
+        "gamesPerSecond": len(results) / seconds,
+        "ticksPerSecond": sum(ticks) / seconds,
+    }
+
+
+def timedRun(seeds: range, workers: int, chunkSize: int, config: BoardConfig,
+             maxTicks: int, verbose: bool = False,
+             engineClass: type[SnakeEngine] = SnakeEngine, botName: str = "greedy",
+             budget: float = 0.002) -> dict:
+    """
+        This function runs a tournament, optionally printing each chunk
+        as it arrives, and returns its summary.
+    """
+    results: list[dict] = []
+    start = time.perf_counter()
+    for chunk in runTournament(seeds, workers, chunkSize, config, maxTicks, engineClass, botName, budget):
+        results.extend(chunk)
+        if verbose:
+            for result in chunk:
+                print(result)
+    return summarize(results, time.perf_counter() - start)
+
+
+def printSummary(summary: dict) -> None:
+    """
+        This function prints a summary in a readable form.
+    """
+    for key, value in summary.items():
+        if isinstance(value, float):
+            value = f"{value:,.2f}"
+        print(f"{key:>15}: {value}")
+
+
+def positiveInt(text: str) -> int:
+    """
+        This function parses a command line count that must be at least 1.
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+        This function parses the command line and runs the tournament,
+        or the throughput scaling report when --scaling is given.
+    """
+    parser = argparse.ArgumentParser(description="Run seeded headless snake games on a process pool.")
+    parser.add_argument("--workers", type=positiveInt, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--games", type=positiveInt, default=1000, help="number of games to play")
+    parser.add_argument("--first-seed", type=int, default=0, help="seed of the first game; games use consecutive seeds")
+    parser.add_argument("--chunk-size", type=positiveInt, default=50, help="games per chunk sent back by a worker")
+    parser.add_argument("--max-ticks", type=int, default=10_000, help="ticks after which a game is stopped")
+    parser.add_argument("--width", type=int, default=500, help="board width in pixels")
+    parser.add_argument("--height", type=int, default=300, help="board height in pixels")
+    parser.add_argument("--compact", action="store_true",
+                        help="play with the memory-compact engine, for very large boards")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="greedy", help="bot steering the games")
+    parser.add_argument("--budget", type=float, default=0.002, help="seconds the autopilot may take per move")
+    parser.add_argument("--verbose", action="store_true", help="print every game result as it arrives")
+    parser.add_argument("--scaling", action="store_true",
+                        help="report throughput for 1, 2, 4, ... up to --workers workers")
+    args = parser.parse_args(argv)
+
+    config = BoardConfig(args.width, args.height)
+    seeds = range(args.first_seed, args.first_seed + args.games)
+    engineClass = CompactSnakeEngine if args.compact else SnakeEngine
+    if not args.scaling:
+        printSummary(timedRun(seeds, args.workers, args.chunk_size, config, args.max_ticks, args.verbose,
+                              engineClass, args.bot, args.budget))
+        return
+
+    workerCounts = sorted({min(2 ** i, args.workers) for i in range(args.workers.bit_length() + 1)})
+    baseline = None
+    print(f"{'workers':>8} {'games/s':>12} {'ticks/s':>14} {'speedup':>8} {'efficiency':>10}")
+    for workers in workerCounts:
+        summary = timedRun(seeds, workers, args.chunk_size, config, args.max_ticks, engineClass=engineClass,
+                           botName=args.bot, budget=args.budget)
+        baseline = baseline or summary["ticksPerSecond"]
+        speedup = summary["ticksPerSecond"] / baseline
+        print(f"{workers:>8} {summary['gamesPerSecond']:>12,.1f} {summary['ticksPerSecond']:>14,.0f} "
+              f"{speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()